@@ -10,28 +10,187 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import argparse
+import sys
+import time
+
 import sgtk
 import json
 
 from framework import patch_environment
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Send commands to ShotGrid Create, interactively or in batch."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Read the commands as JSON lines from FILE, or from stdin with '-', "
+        'e.g. {"command": "list_supported_commands", "data": {}, "id": "a"}.',
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write the batch results as JSON lines to FILE instead of stdout.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Amount of batch commands sent before waiting for their replies.",
+    )
+    return parser.parse_args()
+
+
+def read_batch_commands(lines):
+    """
+    Parse the JSON lines of a batch.
+
+    :param lines: Iterable over the lines of the batch.
+
+    :returns: Iterator over ``(line_number, command, error)`` tuples, where ``command``
+        is the parsed JSON object and ``error`` is set if the line is invalid.
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict) or not command.get("command"):
+                raise ValueError("Expected an object with a 'command'.")
+        except ValueError as e:
+            yield line_number, None, "Invalid command: {0}".format(e)
+        else:
+            yield line_number, command, None
+
+
+def run_batch(client, lines, output, pipeline=1):
+    """
+    Send the commands of a batch on the connection of a client and write a JSON line
+    with the reply and the timing of every command, in the order of the commands.
+
+    :param CreateClient client: Connected client.
+    :param lines: Iterable over the JSON lines of the batch.
+    :param output: File the results are written to.
+    :param int pipeline: Amount of commands sent before waiting for their replies.
+
+    :returns: A summary of the batch with the throughput and the latency percentiles.
+    :rtype: dict
+    """
+    latencies = []
+    error_count = 0
+    start = time.perf_counter()
+
+    window = []
+    commands = read_batch_commands(lines)
+    while True:
+        for line_number, command, error in commands:
+            window.append((line_number, command, error))
+            if len(window) >= max(1, pipeline):
+                break
+
+        if not window:
+            break
+
+        valid = [(n, c) for n, c, error in window if error is None]
+        batch = client.call_server_methods(
+            [(command["command"], command.get("data")) for _, command in valid]
+        )
+        results = dict(
+            (line_number, result)
+            for (line_number, _), result in zip(valid, batch["results"])
+        )
+
+        for line_number, command, error in window:
+            result = results.get(line_number)
+            record = {
+                "line": line_number,
+                "id": command.get("id") if command else None,
+                "command": command["command"] if command else None,
+                "reply": result["reply"] if result else None,
+                "error": result["error"] if result else error,
+                "elapsed_ms": result["elapsed"] * 1000.0 if result else None,
+            }
+            if record["error"] is not None:
+                error_count += 1
+            if result:
+                latencies.append(result["elapsed"])
+            output.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        output.flush()
+        window = []
+
+    elapsed = time.perf_counter() - start
+    count = len(latencies)
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(count - 1, int(round(p * (count - 1))))] * 1000.0
+
+    return {
+        "commands": count,
+        "errors": error_count,
+        "pipeline": pipeline,
+        "elapsed_s": elapsed,
+        "commands_per_s": count / elapsed if elapsed else None,
+        "latency_ms": {
+            "mean": sum(latencies) * 1000.0 / count if count else None,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": percentile(1.0),
+        },
+    }
+
+
 def main():
     from python.create_client import CreateClient, ensure_create_server_is_running
 
+    args = parse_args()
+
     user = sgtk.authentication.ShotgunAuthenticator().get_default_user()
     if not user:
-        print("Unable to create a Desktop Client unauthenticated.")
+        print("Unable to create a Desktop Client unauthenticated.", file=sys.stderr)
         return 1
 
     sgtk.set_authenticated_user(user)
 
     if not ensure_create_server_is_running(user.create_sg_connection()):
-        print("Failed to ensure that ShotGrid Create is running")
+        print("Failed to ensure that ShotGrid Create is running", file=sys.stderr)
         return 2
 
-    client = CreateClient(user.create_sg_connection())
-    commands = client.call_server_method("list_supported_commands")
+    if args.batch:
+        # The commands share one handshaken connection. Pipelined commands are
+        # multiplexed so their replies are read as they come.
+        client = CreateClient(
+            user.create_sg_connection(),
+            multiplexed=args.pipeline > 1,
+            validate_commands=True,
+        )
+        input_file = sys.stdin if args.batch == "-" else open(args.batch, "r")
+        output_file = open(args.output, "w") if args.output else sys.stdout
+        try:
+            summary = run_batch(client, input_file, output_file, args.pipeline)
+        finally:
+            client.close()
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+
+        print(json.dumps(summary, separators=(",", ":")), file=sys.stderr)
+        return 3 if summary["errors"] else 0
+
+    # The commands are listed by the server during the handshake.
+    client = CreateClient(user.create_sg_connection(), validate_commands=True)
+    commands = client.supported_commands
     print("CreateClient standalone client")
     print()
     print("Usage:")
@@ -53,7 +212,7 @@ def main():
             try:
                 user_input = raw_input("> ").strip()
             except NameError:
-                user_input = input("> ").strip
+                user_input = input("> ").strip()
 
             if not user_input:
                 continue
@@ -0,0 +1,279 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measure the CreateClient against a local mock Create server.
+
+Toolkit (tk-core) must be importable. Nothing is sent to a Shotgun site, the Shotgun
+connection is faked.
+
+Usage:
+    python dev/benchmarks/benchmark_create_client.py [--output results.json]
+"""
+
+import argparse
+import datetime
+import platform
+import threading
+import time
+
+from benchmark_utils import (
+    build_entities,
+    clear_client_caches,
+    disable_persistent_caches,
+    import_create_client,
+    summarize,
+    timed,
+    write_results,
+)
+from mock_create_server import FakeShotgun, FakeUser, MockCreateServer
+
+import sgtk
+
+create_client = import_create_client()
+CreateClient = create_client.CreateClient
+
+DEFAULT_PAYLOAD_SIZES = [0, 1024, 16 * 1024, 256 * 1024, 1024 * 1024]
+DEFAULT_THREAD_COUNTS = [1, 2, 4, 8]
+DEFAULT_ENTITY_COUNTS = [1000, 100000]
+
+
+def bench_construction(sg, iterations):
+    """
+    Time building a client with nothing cached, and with the connection pool.
+    """
+    results = {}
+    for use_pool in (False, True):
+        create_client.get_connection_pool().clear()
+        samples = []
+        for _ in range(iterations):
+            if not use_pool:
+                # The port, the secret and the user are fetched from Shotgun again.
+                clear_client_caches(CreateClient)
+            duration, client = timed(CreateClient, sg, use_pool=use_pool)
+            client.close()
+            samples.append(duration)
+        results["pooled" if use_pool else "cold"] = summarize(samples)
+    return results
+
+
+def bench_call_latency(sg, iterations, **client_kwargs):
+    """
+    Time sequential calls with a small payload.
+    """
+    client = CreateClient(sg, **client_kwargs)
+    try:
+        samples = [
+            timed(client.call_server_method, "echo", {"index": index})[0]
+            for index in range(iterations)
+        ]
+    finally:
+        client.close()
+    return summarize(samples)
+
+
+def bench_phases(sg, iterations, **client_kwargs):
+    """
+    Break the latency of sequential calls down by phase, with the client metrics.
+    """
+    metrics = create_client.Metrics()
+    client = CreateClient(sg, metrics=metrics, **client_kwargs)
+    try:
+        for index in range(iterations):
+            client.call_server_method("echo", {"index": index})
+    finally:
+        client.close()
+    return metrics.snapshot()
+
+
+def bench_payload_sizes(sg, sizes, iterations):
+    """
+    Time calls echoing payloads of growing sizes, with and without compression, and
+    measure the amount of bytes on the wire.
+    """
+    results = []
+    for compression in (False, True):
+        metrics = create_client.Metrics()
+        client = CreateClient(
+            sg, use_pool=False, metrics=metrics, compression=compression
+        )
+        try:
+            for size in sizes:
+                data = {"entities": build_entities(size)}
+                metrics.reset()
+                samples = [
+                    timed(client.call_server_method, "echo", data)[0]
+                    for _ in range(iterations)
+                ]
+                counters = metrics.snapshot()["counters"]
+                result = summarize(samples)
+                result["size"] = size
+                result["compression"] = compression
+                result["bytes_sent_per_call"] = counters["bytes_sent"] / iterations
+                result["bytes_received_per_call"] = (
+                    counters["bytes_received"] / iterations
+                )
+                results.append(result)
+        finally:
+            client.close()
+    return results
+
+
+def bench_chunked_replies(sg, counts, iterations):
+    """
+    Compare reading a list reply at once with iterating over its chunks, for the time
+    to the first item and to the last one.
+    """
+    results = []
+    client = CreateClient(sg)
+    try:
+        for count in counts:
+            for mode in ("whole", "chunked"):
+                first_samples = []
+                total_samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    if mode == "whole":
+                        items = iter(
+                            client.call_server_method("entities", {"count": count})
+                        )
+                    else:
+                        items = client.iter_server_method("entities", {"count": count})
+                    first = None
+                    for item in items:
+                        if first is None:
+                            first = time.perf_counter() - start
+                    first_samples.append(first or 0.0)
+                    total_samples.append(time.perf_counter() - start)
+                results.append(
+                    {
+                        "count": count,
+                        "mode": mode,
+                        "first_item": summarize(first_samples),
+                        "last_item": summarize(total_samples),
+                    }
+                )
+    finally:
+        client.close()
+    return results
+
+
+def bench_concurrent_clients(sg, thread_counts, calls_per_thread, delay):
+    """
+    Measure the throughput of threads calling the server, each with its own client.
+    """
+    results = []
+    for thread_count in thread_counts:
+        clients = [CreateClient(sg) for _ in range(thread_count)]
+        barrier = threading.Barrier(thread_count + 1)
+
+        def run(client):
+            barrier.wait()
+            for index in range(calls_per_thread):
+                client.call_server_method("echo", {"index": index, "delay": delay})
+
+        threads = [threading.Thread(target=run, args=(c,)) for c in clients]
+        for thread in threads:
+            thread.start()
+
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        for client in clients:
+            client.close()
+
+        total_calls = thread_count * calls_per_thread
+        results.append(
+            {
+                "threads": thread_count,
+                "calls": total_calls,
+                "elapsed_s": elapsed,
+                "calls_per_s": total_calls / elapsed,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--construction-iterations", type=int, default=20)
+    parser.add_argument(
+        "--payload-sizes", type=int, nargs="+", default=DEFAULT_PAYLOAD_SIZES
+    )
+    parser.add_argument("--payload-iterations", type=int, default=10)
+    parser.add_argument(
+        "--entity-counts", type=int, nargs="+", default=DEFAULT_ENTITY_COUNTS
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREAD_COUNTS)
+    parser.add_argument("--calls-per-thread", type=int, default=50)
+    parser.add_argument(
+        "--server-delay",
+        type=float,
+        default=0.0,
+        help="Processing time of the mock server for the concurrency benchmark.",
+    )
+    parser.add_argument(
+        "--sg-latency",
+        type=float,
+        default=0.0,
+        help="Duration of every request to the fake Shotgun site, in seconds.",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    with MockCreateServer() as server:
+        CreateClient.SG_CREATE_WEBSOCKET_URL = server.url_template
+        disable_persistent_caches(CreateClient)
+        sg = FakeShotgun(server, latency=args.sg_latency)
+        sgtk.set_authenticated_user(FakeUser())
+
+        results = {
+            "metadata": {
+                "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "crypto_backend": create_client.get_available_backends()[0],
+                "serializer": create_client.get_available_serializers()[0],
+                "sg_latency": args.sg_latency,
+            },
+            "construction": bench_construction(sg, args.construction_iterations),
+            "call_latency": {
+                "lock_step": bench_call_latency(sg, args.iterations),
+                "multiplexed": bench_call_latency(
+                    sg, args.iterations, multiplexed=True
+                ),
+            },
+            "phases": {
+                "lock_step": bench_phases(sg, args.iterations, use_pool=False),
+                "multiplexed": bench_phases(
+                    sg, args.iterations, use_pool=False, multiplexed=True
+                ),
+            },
+            "payload_sizes": bench_payload_sizes(
+                sg, args.payload_sizes, args.payload_iterations
+            ),
+            "chunked_replies": bench_chunked_replies(
+                sg, args.entity_counts, args.payload_iterations
+            ),
+            "concurrent_clients": bench_concurrent_clients(
+                sg, args.threads, args.calls_per_thread, args.server_delay
+            ),
+            "shotgun_requests": sg.call_counts,
+        }
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compare the throughput of the Fernet backends at several payload sizes.
+
+Usage:
+    python dev/benchmarks/benchmark_crypto.py [--sizes 1024 1048576] [--output results.json]
+"""
+
+import argparse
+import base64
+import os
+import time
+
+from benchmark_utils import load_framework_module, write_results
+
+crypto = load_framework_module("crypto")
+
+DEFAULT_SIZES = [256, 4 * 1024, 64 * 1024, 1024 * 1024]
+
+
+def benchmark_backend(backend, size, min_duration):
+    """
+    Encrypt and decrypt a payload repeatedly for at least ``min_duration`` seconds.
+
+    :returns: Dictionary with the encryption and decryption throughput in MB/s.
+    """
+    key = base64.urlsafe_b64encode(os.urandom(32))
+    f = crypto.create_fernet(key, backend)
+    payload = os.urandom(size)
+
+    iterations = 0
+    encrypt_time = 0.0
+    decrypt_time = 0.0
+    while encrypt_time + decrypt_time < min_duration:
+        start = time.perf_counter()
+        token = f.encrypt(payload)
+        encrypt_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        f.decrypt(token)
+        decrypt_time += time.perf_counter() - start
+        iterations += 1
+
+    megabytes = size * iterations / (1024.0 * 1024.0)
+    return {
+        "backend": backend,
+        "size": size,
+        "iterations": iterations,
+        "encrypt_mb_per_s": megabytes / encrypt_time,
+        "decrypt_mb_per_s": megabytes / decrypt_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--min-duration", type=float, default=1.0)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    for backend in crypto.get_available_backends():
+        for size in args.sizes:
+            result = benchmark_backend(backend, size, args.min_duration)
+            results.append(result)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
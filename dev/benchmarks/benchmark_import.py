@@ -0,0 +1,118 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measure the import time of the vendored packages and of the framework.
+
+Every import is timed in a new Python process: the vendors imported from the zip and
+from the extracted folder, and the create_client package before and after its first
+use. The vendors are extracted to the Toolkit cache folder under a ``benchmark``
+version, which is removed afterwards.
+
+Toolkit (tk-core) must be importable.
+
+Usage:
+    python dev/benchmarks/benchmark_import.py [--runs 10] [--output results.json]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmark_utils import ROOT_DIR, VENDORS_PATH, summarize, write_results
+
+import importlib.util
+
+VERSION = "benchmark"
+
+IMPORT_SCRIPT = """
+import sys
+import time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def load_framework():
+    """
+    Load framework.py, which is not part of a package.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "desktopclient_framework", os.path.join(ROOT_DIR, "framework.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_import(path, statement, runs):
+    """
+    Time a statement in new Python processes, with a path added to the python path.
+
+    :returns: Summary of the durations.
+    :rtype: dict
+    """
+    script = IMPORT_SCRIPT.format(path=path, statement=statement)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", script])
+        samples.append(float(output.decode("utf-8").strip().splitlines()[-1]))
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    framework = load_framework()
+    extracted_path = framework.get_vendors_cache_path(VERSION)
+    shutil.rmtree(extracted_path, ignore_errors=True)
+
+    try:
+        start = time.perf_counter()
+        framework.extract_vendors(VERSION)
+        extraction_time = time.perf_counter() - start
+
+        vendors_import = "import websocket, fernet"
+        package_path = os.path.join(ROOT_DIR, "python")
+        package_import = "sys.path.insert(0, {0!r})\nimport create_client".format(
+            package_path
+        )
+
+        results = {
+            "extraction_s": extraction_time,
+            "vendors": {
+                "zip": time_import(VENDORS_PATH, vendors_import, args.runs),
+                "extracted": time_import(extracted_path, vendors_import, args.runs),
+            },
+            "package": {
+                "import": time_import(extracted_path, package_import, args.runs),
+                "first_use": time_import(
+                    extracted_path,
+                    package_import + "\ncreate_client.CreateClient",
+                    args.runs,
+                ),
+            },
+        }
+    finally:
+        shutil.rmtree(extracted_path, ignore_errors=True)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measure the peak memory allocated by the client to send and receive large payloads,
+with tracemalloc.
+
+Two measures are taken for every payload size:
+    - ``framing``: writing an encrypted payload in a websocket frame, with
+      ``WebSocket.send`` and with the framework frame writer, on a socket accepting
+      16 KB per write like a TLS socket.
+    - ``calls``: a whole ``call_server_method`` round trip of a string argument, against
+      a mock Create server running in another process so only the allocations of the
+      client are traced. The string is echoed back, so the reply itself weighs about the
+      size of the payload in the peak.
+
+Toolkit must be importable for the ``calls`` measure.
+
+Usage:
+    python dev/benchmarks/benchmark_memory.py [--sizes 1048576] [--output results.json]
+"""
+
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from benchmark_utils import (
+    disable_persistent_caches,
+    import_create_client,
+    load_framework_module,
+    write_results,
+)
+
+import websocket
+
+crypto = load_framework_module("crypto")
+frames = load_framework_module("frames")
+
+DEFAULT_SIZES = [64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+
+# Amount of bytes a TLS socket sends per write, a record.
+TLS_RECORD_SIZE = 16 * 1024
+
+
+class _DiscardingSocket(object):
+    """
+    Socket dropping what is written, accepting at most a TLS record per ``send``.
+    """
+
+    def send(self, data):
+        return min(len(data), TLS_RECORD_SIZE)
+
+    def sendall(self, data):
+        pass
+
+    def gettimeout(self):
+        return None
+
+
+def measure_peak(func, *args):
+    """
+    Call a function and measure the peak of the memory allocated during the call.
+
+    :returns: The peak, in bytes, above the memory allocated before the call, and the
+        duration of the call in seconds.
+    :rtype: tuple
+    """
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        func(*args)
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - baseline, duration
+
+
+def benchmark_framing(size):
+    """
+    Measure the framing of an encrypted payload of about ``size`` bytes.
+    """
+    key = base64.urlsafe_b64encode(os.urandom(32))
+    token = crypto.create_fernet(key).encrypt(os.urandom(size))
+
+    connection = websocket.WebSocket()
+    connection.sock = _DiscardingSocket()
+
+    results = {"size": len(token)}
+    for name, func in (
+        ("websocket_send", connection.send),
+        ("send_frame", lambda data: frames.send_frame(connection, data)),
+    ):
+        peak, duration = measure_peak(func, token)
+        results[name] = {
+            "peak_bytes": peak,
+            "peak_per_payload_byte": peak / float(len(token)),
+            "duration_ms": duration * 1000.0,
+        }
+    return results
+
+
+def start_server():
+    """
+    Start a mock Create server in another process.
+
+    :returns: The server process, its port and its secret.
+    :rtype: tuple
+    """
+    secret = base64.urlsafe_b64encode(os.urandom(32))
+    ready_file = os.path.join(
+        tempfile.gettempdir(), "mock_create_ready_{0}.json".format(os.getpid())
+    )
+    env = dict(
+        os.environ,
+        MOCK_CREATE_SECRET=secret.decode("utf-8"),
+        SHOTGUN_CREATE_READY_FILE=ready_file,
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(__file__), "mock_create_server.py"),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 30
+    while not os.path.exists(ready_file):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("The mock Create server didn't start.")
+        time.sleep(0.05)
+
+    with open(ready_file) as f:
+        port = json.load(f)["websocket_port"]
+    os.remove(ready_file)
+    return process, port, secret
+
+
+def benchmark_calls(sizes, compression):
+    """
+    Measure ``call_server_method`` round trips echoing a string.
+    """
+    import sgtk
+    from mock_create_server import FakeShotgun, FakeUser
+
+    create_client = import_create_client()
+
+    process, port, secret = start_server()
+    try:
+        create_client.CreateClient.SG_CREATE_WEBSOCKET_URL = "ws://127.0.0.1:{0}"
+        disable_persistent_caches(create_client.CreateClient)
+        sgtk.set_authenticated_user(FakeUser())
+        sg = FakeShotgun(types.SimpleNamespace(port=port, secret=secret))
+        client = create_client.CreateClient(
+            sg, port_override=port, use_pool=False, compression=compression
+        )
+
+        results = []
+        for size in sizes:
+            data = {"blob": base64.b64encode(os.urandom(size * 3 // 4)).decode("ascii")}
+            # Warm up the caches, only the allocations of the call are measured.
+            client.call_server_method("echo", data)
+            peak, duration = measure_peak(client.call_server_method, "echo", data)
+            results.append(
+                {
+                    "size": size,
+                    "compression": compression,
+                    "peak_bytes": peak,
+                    "peak_per_payload_byte": peak / float(size),
+                    "duration_ms": duration * 1000.0,
+                }
+            )
+        client.close()
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = {
+        "framing": [benchmark_framing(size) for size in args.sizes],
+        "calls": benchmark_calls(args.sizes, compression=False)
+        + benchmark_calls(args.sizes, compression=True),
+    }
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
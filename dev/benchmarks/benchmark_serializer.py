@@ -0,0 +1,77 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compare the throughput of the JSON serializers on entity lists of several sizes.
+
+Usage:
+    python dev/benchmarks/benchmark_serializer.py [--sizes 1024 1048576] [--output results.json]
+"""
+
+import argparse
+import time
+
+from benchmark_utils import build_entities, load_framework_module, write_results
+
+serializer = load_framework_module("serializer")
+
+DEFAULT_SIZES = [1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+
+
+def benchmark_serializer(name, size, min_duration):
+    """
+    Serialize and parse an entity list repeatedly for at least ``min_duration`` seconds.
+
+    :returns: Dictionary with the serialization and parsing throughput in MB/s.
+    """
+    s = serializer.create_serializer(name)
+    entities = build_entities(size)
+    document = s.dumps(entities)
+
+    iterations = 0
+    dumps_time = 0.0
+    loads_time = 0.0
+    while dumps_time + loads_time < min_duration:
+        start = time.perf_counter()
+        s.dumps(entities)
+        dumps_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        s.loads(document)
+        loads_time += time.perf_counter() - start
+        iterations += 1
+
+    megabytes = len(document) * iterations / (1024.0 * 1024.0)
+    return {
+        "serializer": name,
+        "size": len(document),
+        "iterations": iterations,
+        "dumps_mb_per_s": megabytes / dumps_time,
+        "loads_mb_per_s": megabytes / loads_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--min-duration", type=float, default=1.0)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    for name in serializer.get_available_serializers():
+        for size in args.sizes:
+            results.append(benchmark_serializer(name, size, args.min_duration))
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Helpers shared by the benchmarks.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)
+)
+
+# Make the vendored packages importable.
+VENDORS_PATH = os.path.join(ROOT_DIR, "Vendors", "pkgs.zip")
+if VENDORS_PATH not in sys.path:
+    sys.path.insert(0, VENDORS_PATH)
+
+
+def load_framework_module(name):
+    """
+    Load a module of the create_client package that doesn't need Toolkit, without
+    importing the package itself.
+
+    :param str name: Name of the module, for example ``crypto``.
+
+    :returns: The loaded module.
+    """
+    module_name = "create_client_{0}".format(name)
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(ROOT_DIR, "python", "create_client", name + ".py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_create_client():
+    """
+    Import the create_client package. Toolkit must be importable.
+
+    :returns: The create_client package.
+    """
+    python_path = os.path.join(ROOT_DIR, "python")
+    if python_path not in sys.path:
+        sys.path.insert(0, python_path)
+
+    import create_client
+
+    return create_client
+
+
+def disable_persistent_caches(client_class):
+    """
+    Keep the WebSocket server ports and secrets of the mock servers out of the on disk
+    caches of the user.
+
+    :param client_class: The ``CreateClient`` class.
+    """
+    client_class.PERSIST_WEBSOCKET_PORT = False
+    client_class.PERSIST_WEBSOCKET_SERVER_SECRET = False
+
+
+def clear_client_caches(client_class):
+    """
+    Forget the WebSocket server ports and secrets and the user information cached by the
+    clients of the process, so the next client starts cold.
+
+    :param client_class: The ``CreateClient`` class.
+    """
+    client_class._websocket_port_cache.invalidate()
+    client_class._websocket_server_secret_cache.invalidate()
+    client_class._user_context_cache.invalidate()
+
+
+def timed(func, *args, **kwargs):
+    """
+    Call a function and time it.
+
+    :returns: The duration of the call in seconds and its result.
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def summarize(samples):
+    """
+    Summarize latency samples.
+
+    :param list samples: Durations in seconds.
+
+    :returns: Count, mean and percentiles of the samples, in milliseconds.
+    :rtype: dict
+    """
+    samples = sorted(samples)
+    count = len(samples)
+
+    def percentile(p):
+        return samples[min(count - 1, int(round(p / 100.0 * (count - 1))))] * 1000.0
+
+    return {
+        "count": count,
+        "mean_ms": sum(samples) / count * 1000.0,
+        "min_ms": samples[0] * 1000.0,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": samples[-1] * 1000.0,
+    }
+
+
+def build_entities(size):
+    """
+    Build a list of entity dictionaries, like a Shotgun query result, of about ``size``
+    bytes once serialized.
+    """
+    entities = []
+    length = 2
+    index = 0
+    while length < size:
+        entity = {
+            "type": "Version",
+            "id": 10000 + index,
+            "code": "seq{0:03d}_shot{1:04d}_comp_v{2:03d}".format(
+                index % 7, index % 997, index % 31
+            ),
+            "sg_status_list": ("rev", "apr", "ip")[index % 3],
+            "description": "Take {0}, {1} notes".format(index, index % 13),
+            "entity": {"type": "Shot", "id": 2000 + index % 997},
+        }
+        entities.append(entity)
+        length += len(json.dumps(entity)) + 2
+        index += 1
+    return entities
+
+
+def write_results(results, path=None):
+    """
+    Print the results as JSON and write them to a file.
+
+    :param results: JSON serializable results.
+    :param str path: File to write the results to. If not set, they are only printed.
+    """
+    print(json.dumps(results, indent=2))
+
+    if path:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Local stand-in for the Create WebSocket server and for the Shotgun connection, so the
+CreateClient can be measured offline.
+
+The server implements just enough of RFC 6455 and of the Create protocol for the client:
+the handshake commands and Fernet encrypted commands replying with their arguments.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from benchmark_utils import load_framework_module
+
+crypto = load_framework_module("crypto")
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+class _ClientConnection(object):
+    """
+    Server side of a websocket connection.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.encrypted = False
+        # Replies are sent with the opcode of the last frame received.
+        self.opcode = OPCODE_TEXT
+        self._write_lock = threading.Lock()
+
+    def read_frame(self):
+        """
+        Read a frame sent by the client.
+
+        :returns: Opcode and unmasked data of the frame.
+        :rtype: tuple
+        """
+        first_byte, second_byte = self._read_exact(2)
+        opcode = first_byte & 0x0F
+        length = second_byte & 0x7F
+        if length == 126:
+            (length,) = struct.unpack(">H", self._read_exact(2))
+        elif length == 127:
+            (length,) = struct.unpack(">Q", self._read_exact(8))
+
+        mask = self._read_exact(4) if second_byte & 0x80 else None
+        data = self._read_exact(length)
+        if mask:
+            # Unmask 4 bytes at a time, this is the hot path for large payloads.
+            mask_int = int.from_bytes(mask * (length // 4 + 1), "little")
+            data_int = int.from_bytes(data, "little")
+            data = (data_int ^ mask_int).to_bytes(length + 4, "little")[:length]
+
+        return opcode, data
+
+    def write_frame(self, opcode, data):
+        """
+        Send an unmasked frame to the client.
+        """
+        header = bytes([0x80 | opcode])
+        length = len(data)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack(">H", length)
+        else:
+            header += bytes([127]) + struct.pack(">Q", length)
+
+        with self._write_lock:
+            self.sock.sendall(header + data)
+
+    def _read_exact(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, 1024 * 1024))
+            if not chunk:
+                raise ConnectionError("The client closed the connection.")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
+class MockCreateServer(object):
+    """
+    WebSocket server answering like Create.
+
+    Commands:
+        - ``get_protocol_version``, ``get_ws_server_id`` and ``list_supported_commands``
+          for the handshake.
+        - ``echo``: replies with its arguments, minus the user block.
+        - ``entities``: replies with a list of ``count`` entities.
+        - ``emit``: replies right away, then pushes ``count`` events named ``event``
+          with ``data`` on the connection.
+
+    When chunked replies are enabled, the server lists ``chunked_replies`` among its
+    commands and sends the list replies in chunks to the clients asking for it.
+
+    When compression is enabled, the server lists ``zlib_compression`` among its commands,
+    accepts zlib compressed messages and compresses its large replies for the clients
+    asking for it.
+
+    When binary frames are enabled, the server lists ``binary_frames`` among its
+    commands. It always replies with the opcode of the last frame it received.
+
+    Every command accepts a ``delay`` argument, in seconds, to simulate the processing
+    time of Create. Delayed commands are processed on their own thread so their replies
+    can come back out of order.
+    """
+
+    PROTOCOL_VERSION = 2
+    COMPRESSION_THRESHOLD = 8 * 1024
+
+    def __init__(
+        self,
+        secret=None,
+        server_id="mock-create",
+        host="127.0.0.1",
+        port=0,
+        compression=True,
+        chunked_replies=True,
+        binary_frames=True,
+    ):
+        """
+        :param bytes secret: Fernet key shared with the fake Shotgun connection. If not set,
+            a new key is generated.
+        :param str server_id: Id of the WebSocket server.
+        :param str host: Interface to listen on.
+        :param int port: Port to listen on. If ``0``, a free port is picked.
+        :param bool compression: If ``True``, the server supports zlib compression.
+        :param bool chunked_replies: If ``True``, the server can send chunked replies.
+        :param bool binary_frames: If ``True``, the server accepts binary frames.
+        """
+        self.secret = secret or base64.urlsafe_b64encode(os.urandom(32))
+        self.server_id = server_id
+        self.compression = compression
+        self.chunked_replies = chunked_replies
+        self.binary_frames = binary_frames
+        self.connection_count = 0
+        self.message_count = 0
+        self.commands = {
+            "get_ws_server_id": self._get_ws_server_id,
+            "list_supported_commands": self._list_supported_commands,
+            "echo": self._echo,
+            "emit": self._emit,
+            "entities": self._entities,
+        }
+
+        self._fernet = crypto.create_fernet(self.secret)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self.host, self.port = self._sock.getsockname()
+        self._running = False
+
+    @property
+    def url_template(self):
+        """
+        URL of the server, with the port as a ``{0}`` placeholder like
+        ``CreateClient.SG_CREATE_WEBSOCKET_URL``.
+        """
+        return "ws://{0}:{{0}}".format(self.host)
+
+    def start(self):
+        """
+        Start accepting connections on a background thread.
+        """
+        self._running = True
+        self._sock.listen(128)
+        thread = threading.Thread(target=self._accept_connections)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop accepting connections.
+        """
+        self._running = False
+        try:
+            # Wakes up the thread blocked on accept, closing alone doesn't on Linux.
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _accept_connections(self):
+        while self._running:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connection_count += 1
+            thread = threading.Thread(target=self._serve, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, sock):
+        connection = _ClientConnection(sock)
+        try:
+            self._accept_upgrade(sock)
+            while True:
+                opcode, data = connection.read_frame()
+                if opcode == OPCODE_CLOSE:
+                    connection.write_frame(OPCODE_CLOSE, data[:2])
+                    return
+                elif opcode == OPCODE_PING:
+                    connection.write_frame(OPCODE_PONG, data)
+                elif opcode in (OPCODE_TEXT, OPCODE_BINARY):
+                    connection.opcode = opcode
+                    self._receive(connection, data)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            sock.close()
+
+    def _accept_upgrade(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("The client closed the connection.")
+            request += chunk
+
+        key = None
+        for line in request.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        sock.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\n"
+            b"Connection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+
+    def _receive(self, connection, data):
+        self.message_count += 1
+
+        if data == b"get_protocol_version":
+            reply = {"protocol_version": self.PROTOCOL_VERSION}
+            connection.write_frame(OPCODE_TEXT, json.dumps(reply).encode("utf-8"))
+            return
+
+        # Everything is encrypted once the client got the secret.
+        if not data.startswith(b"{"):
+            try:
+                data = self._fernet.decrypt(data)
+            except Exception:
+                # Encrypted with another secret, drop the client.
+                raise ConnectionError("The client used an invalid secret.")
+            connection.encrypted = True
+            if data[:1] == b"\x78":
+                data = zlib.decompress(data)
+
+        message = json.loads(data)
+        delay = message["command"]["data"].get("delay")
+        if delay:
+            thread = threading.Thread(
+                target=self._answer, args=(connection, message, delay)
+            )
+            thread.daemon = True
+            thread.start()
+        else:
+            self._answer(connection, message)
+
+    def _answer(self, connection, message, delay=None):
+        if delay:
+            time.sleep(delay)
+
+        command = message["command"]
+        handler = self.commands.get(command["name"])
+        if handler is None:
+            reply = {"error": "Unknown command {0}".format(command["name"])}
+        else:
+            reply = handler(command["data"])
+
+        chunk_size = message.get("chunk_size")
+        if self.chunked_replies and chunk_size and isinstance(reply, list):
+            self._send_chunks(connection, message, reply, chunk_size)
+            return
+
+        payload = json.dumps(
+            {
+                "protocol_version": self.PROTOCOL_VERSION,
+                "id": message["id"],
+                "timestamp": int(time.time() * 1000),
+                "reply": reply,
+            }
+        ).encode("utf-8")
+        self._send(connection, message, payload)
+
+    def _send_chunks(self, connection, message, reply, chunk_size):
+        starts = range(0, len(reply), chunk_size) or [0]
+        for start in starts:
+            payload = json.dumps(
+                {
+                    "protocol_version": self.PROTOCOL_VERSION,
+                    "id": message["id"],
+                    "timestamp": int(time.time() * 1000),
+                    "chunk": {
+                        "index": start // chunk_size,
+                        "items": reply[start : start + chunk_size],
+                        "last": start + chunk_size >= len(reply),
+                    },
+                }
+            ).encode("utf-8")
+            self._send(connection, message, payload)
+
+    def _send(self, connection, message, payload):
+        if (
+            message.get("compression") == "zlib"
+            and len(payload) >= self.COMPRESSION_THRESHOLD
+        ):
+            payload = zlib.compress(payload, 1)
+
+        if connection.encrypted:
+            payload = self._fernet.encrypt(payload)
+
+        try:
+            connection.write_frame(connection.opcode, payload)
+            if message["command"]["name"] == "emit":
+                self._push_events(connection, message["command"]["data"])
+        except OSError:
+            pass
+
+    def _push_events(self, connection, data):
+        for index in range(data.get("count", 1)):
+            payload = json.dumps(
+                {
+                    "protocol_version": self.PROTOCOL_VERSION,
+                    "event": data["event"],
+                    "timestamp": int(time.time() * 1000),
+                    "data": dict(data.get("data") or {}, index=index),
+                }
+            ).encode("utf-8")
+            connection.write_frame(connection.opcode, self._fernet.encrypt(payload))
+
+    def _get_ws_server_id(self, data):
+        return {"ws_server_id": self.server_id}
+
+    def _list_supported_commands(self, data):
+        commands = sorted(self.commands)
+        if self.compression:
+            commands.append("zlib_compression")
+        if self.chunked_replies:
+            commands.append("chunked_replies")
+        if self.binary_frames:
+            commands.append("binary_frames")
+        return commands
+
+    def _entities(self, data):
+        return [
+            {"type": "Version", "id": index, "code": "version_{0:06d}".format(index)}
+            for index in range(data.get("count", 0))
+        ]
+
+    def _emit(self, data):
+        return {"count": data.get("count", 1)}
+
+    def _echo(self, data):
+        data = dict(data)
+        data.pop("user", None)
+        data.pop("delay", None)
+        return data
+
+
+class FakeUser(object):
+    """
+    Authenticated user for the fake Shotgun connection.
+    """
+
+    def __init__(self, login="mock.user"):
+        self.login = login
+
+
+class FakeShotgun(object):
+    """
+    Shotgun connection providing what the CreateClient needs from a site.
+    """
+
+    def __init__(self, server, base_url="https://mock.shotgunstudio.com", latency=0.0):
+        """
+        :param MockCreateServer server: Server whose secret and port are served.
+        :param str base_url: Url of the fake site.
+        :param float latency: Amount of seconds every request to the site takes.
+        """
+        self.base_url = base_url
+        self.latency = latency
+        self.call_counts = {
+            "preferences_read": 0,
+            "find_one": 0,
+            "retrieve_ws_server_secret": 0,
+        }
+        self._server = server
+        self._lock = threading.Lock()
+
+    def preferences_read(self, prefs=None):
+        self._request("preferences_read")
+        return {
+            "view_master_settings": json.dumps({"websocket_port": self._server.port})
+        }
+
+    def find_one(self, entity_type, filters, fields=None):
+        self._request("find_one")
+        return {
+            "type": "HumanUser",
+            "id": 42,
+            "name": "Mock User",
+            "groups": [{"type": "Group", "id": 1}],
+            "permission_rule_set": {
+                "type": "PermissionRuleSet",
+                "id": 7,
+                "name": "Artist",
+            },
+        }
+
+    def _call_rpc(self, method, params):
+        self._request(method)
+        return {"ws_server_secret": self._server.secret.decode("utf-8").rstrip("=")}
+
+    def _request(self, name):
+        with self._lock:
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def write_ready_file(path, port):
+    """
+    Write the ready file once the WebSocket server is listening.
+
+    The ready file is a proposed protocol, Shotgun Create doesn't write it yet.
+
+    :param str path: Path given by ``SHOTGUN_CREATE_READY_FILE``.
+    :param int port: Port of the server.
+    """
+    tmp_path = "{0}.tmp".format(path)
+    with open(tmp_path, "w") as f:
+        json.dump({"websocket_port": port, "pid": os.getpid()}, f)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    # The server can stand in for the Shotgun Create executable, through the
+    # SHOTGUN_CREATE_<OS>_PATH override, and is then configured by the environment.
+    if os.environ.get("MOCK_CREATE_EXIT_CODE"):
+        sys.exit(int(os.environ["MOCK_CREATE_EXIT_CODE"]))
+    time.sleep(float(os.environ.get("MOCK_CREATE_STARTUP_DELAY", "0")))
+
+    secret = os.environ.get("MOCK_CREATE_SECRET")
+    port = int(
+        sys.argv[1] if len(sys.argv) > 1 else os.environ.get("MOCK_CREATE_PORT", 0)
+    )
+    with MockCreateServer(
+        secret=secret.encode("utf-8") if secret else None, port=port
+    ) as server:
+        print("Mock Create server listening on port {0}".format(server.port))
+        print("Secret: {0}".format(server.secret.decode("utf-8")))
+        if os.environ.get("SHOTGUN_CREATE_READY_FILE"):
+            write_ready_file(os.environ["SHOTGUN_CREATE_READY_FILE"], server.port)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
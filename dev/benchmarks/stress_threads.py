@@ -0,0 +1,162 @@
+# Copyright (c) 2024 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Stress a CreateClient shared between threads against a local mock Create server.
+
+Every thread sends its own arguments to the ``echo`` command and checks that it gets
+them back, so a reply delivered to the wrong thread is detected. The throughput is
+reported for each thread count, in lock-step and in multiplexed mode.
+
+The ``*_validated`` modes use a new client for every thread count, which validates the
+commands and only connects on its first call, so the first calls of the threads race to
+build the connection and list the commands of the server.
+
+Toolkit (tk-core) must be importable. The script exits with an error if a reply was
+delivered to the wrong caller.
+
+Usage:
+    python dev/benchmarks/stress_threads.py [--output results.json]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+from benchmark_utils import (
+    disable_persistent_caches,
+    import_create_client,
+    write_results,
+)
+from mock_create_server import FakeShotgun, FakeUser, MockCreateServer
+
+import sgtk
+
+create_client = import_create_client()
+CreateClient = create_client.CreateClient
+
+DEFAULT_THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+
+# Name of the modes and options of their clients.
+MODES = (
+    ("lock_step", {"multiplexed": False}),
+    ("multiplexed", {"multiplexed": True}),
+    (
+        "lock_step_validated",
+        {"multiplexed": False, "connect": False, "validate_commands": True},
+    ),
+    (
+        "multiplexed_validated",
+        {"multiplexed": True, "connect": False, "validate_commands": True},
+    ),
+)
+
+
+def stress(client, thread_count, calls_per_thread, delay):
+    """
+    Call the server from many threads sharing the same client.
+
+    :returns: The throughput and the amount of errors and mismatched replies.
+    :rtype: dict
+    """
+    barrier = threading.Barrier(thread_count + 1)
+    errors = []
+    mismatches = []
+
+    def run(thread_index):
+        barrier.wait()
+        for index in range(calls_per_thread):
+            data = {"thread": thread_index, "index": index}
+            try:
+                reply = client.call_server_method("echo", dict(data, delay=delay))
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            if reply != data:
+                mismatches.append((data, reply))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(thread_count)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total_calls = thread_count * calls_per_thread
+    return {
+        "threads": thread_count,
+        "calls": total_calls,
+        "elapsed_s": elapsed,
+        "calls_per_s": total_calls / elapsed,
+        "errors": len(errors),
+        "mismatches": len(mismatches),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREAD_COUNTS)
+    parser.add_argument("--calls-per-thread", type=int, default=50)
+    parser.add_argument(
+        "--server-delay",
+        type=float,
+        default=0.005,
+        help="Processing time of the mock server for every call, in seconds.",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    with MockCreateServer() as server:
+        CreateClient.SG_CREATE_WEBSOCKET_URL = server.url_template
+        disable_persistent_caches(CreateClient)
+        sg = FakeShotgun(server)
+        sgtk.set_authenticated_user(FakeUser())
+
+        results = {"server_delay": args.server_delay}
+        for mode, options in MODES:
+            if options.get("connect", True):
+                client = CreateClient(sg, **options)
+                try:
+                    results[mode] = [
+                        stress(client, count, args.calls_per_thread, args.server_delay)
+                        for count in args.threads
+                    ]
+                finally:
+                    client.close()
+                continue
+
+            # A new client for every thread count, not borrowing a pooled connection.
+            results[mode] = []
+            for count in args.threads:
+                client = CreateClient(sg, use_pool=False, **options)
+                try:
+                    results[mode].append(
+                        stress(client, count, args.calls_per_thread, args.server_delay)
+                    )
+                finally:
+                    client.close()
+
+    write_results(results, args.output)
+
+    failures = sum(
+        result["errors"] + result["mismatches"]
+        for mode, _ in MODES
+        for result in results[mode]
+    )
+    if failures:
+        sys.exit("{0} calls failed or got the wrong reply.".format(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,23 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import compileall
+import hashlib
 import os
+import shutil
 import sys
 import platform
+import tempfile
+import zipfile
 
 import sgtk
+from sgtk.util import LocalFileStorageManager
 
 logger = sgtk.platform.get_logger(__name__)
 
+# Path added to the python path by patch_environment.
+_patched_vendor_path = None
+
 
 def get_vendors_path():
     """Return the path to the vendors folder.
@@ -35,26 +44,103 @@ def get_vendors_path():
     )
 
 
-def patch_environment():
+def get_vendors_cache_path(version):
+    """Return the folder the vendors are extracted to.
+
+    The folder name changes with the framework version and with the vendors zip, so an
+    update never uses the packages extracted for another version.
+
+    :param str version: Version of the framework.
+
+    :returns: path to the extracted vendors folder
+    :rtype: str
+    """
+    zip_stat = os.stat(get_vendors_path())
+    signature = hashlib.sha1(
+        "{0}:{1}".format(zip_stat.st_size, zip_stat.st_mtime_ns).encode("utf-8")
+    ).hexdigest()[:12]
+
+    return os.path.join(
+        LocalFileStorageManager.get_global_root(LocalFileStorageManager.CACHE),
+        "tk-framework-desktopclient",
+        "vendors",
+        "{0}-{1}".format(version, signature),
+    )
+
+
+def extract_vendors(version):
+    """Extract the vendors zip to a local folder and compile the packages, once per
+    framework version.
+
+    Importing from a folder with compiled bytecode is much faster than importing from a
+    zip, which compiles the modules on every import.
+
+    :param str version: Version of the framework.
+
+    :returns: path to the extracted vendors folder, or ``None`` if the extraction failed
+    :rtype: str
+    """
+    try:
+        vendor_path = get_vendors_cache_path(version)
+        if os.path.isdir(vendor_path):
+            return vendor_path
+
+        parent_path = os.path.dirname(vendor_path)
+        if not os.path.isdir(parent_path):
+            os.makedirs(parent_path)
+
+        # Extract next to the final folder and rename it once complete, so a partial
+        # extraction is never used, even by another process extracting at the same time.
+        tmp_path = tempfile.mkdtemp(dir=parent_path)
+        try:
+            with zipfile.ZipFile(get_vendors_path()) as vendors_zip:
+                vendors_zip.extractall(tmp_path)
+            compileall.compile_dir(tmp_path, quiet=1)
+            os.rename(tmp_path, vendor_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(vendor_path):
+                raise
+
+        logger.debug("Extracted the vendors to {}".format(vendor_path))
+        return vendor_path
+    except Exception as e:
+        logger.debug("Failed to extract the vendors: {}".format(str(e)))
+        return None
+
+
+def patch_environment(version=None):
     """
     This function patch the python path to add the required modules to the python path.
+
+    :param str version: Version of the framework. If set, the vendors are extracted to a
+        local folder which is added to the python path instead of the zip.
     """
-    # Try to import websocket to see if we are good to go.
+    global _patched_vendor_path
+
+    vendor_path = None
+    if version is not None:
+        vendor_path = extract_vendors(version)
 
-    vendor_path = get_vendors_path()
+    # Fall back on importing from the zip.
+    vendor_path = vendor_path or get_vendors_path()
 
     if vendor_path not in sys.path:
         logger.debug("Adding {} to the python path".format(vendor_path))
         sys.path.insert(0, vendor_path)
+    _patched_vendor_path = vendor_path
 
 
 def unpatch_environment():
     """
     Removes the vendors path from the python path.
     """
-    vendor_path = get_vendors_path()
+    global _patched_vendor_path
+
+    vendor_path = _patched_vendor_path or get_vendors_path()
     if vendor_path in sys.path:
-        sys.path.remove(get_vendors_path())
+        sys.path.remove(vendor_path)
+    _patched_vendor_path = None
 
 
 class CreateClientFramework(sgtk.platform.Framework):
@@ -64,7 +150,14 @@ class CreateClientFramework(sgtk.platform.Framework):
         Called by the engine as it loads the framework.
         """
         self.log_debug("%s: Initializing..." % self)
-        patch_environment()
+        patch_environment(self.version if self.get_setting("extract_vendors") else None)
+
+        self._prewarmer = None
+        if self.get_setting("prewarm_connection"):
+            create_client = self.import_module("create_client")
+            # The Shotgun connections of Toolkit are per thread.
+            self._prewarmer = create_client.ConnectionPrewarmer(lambda: self.shotgun)
+            self._prewarmer.start()
 
     def destroy_framework(self):
         """
@@ -72,4 +165,10 @@ class CreateClientFramework(sgtk.platform.Framework):
         Called by the engine as it is being destroyed.
         """
         self.log_debug("%s: Destroying..." % self)
+        if self._prewarmer is not None:
+            if not self._prewarmer.stop():
+                self.log_debug("%s: The connection prewarm is still running." % self)
+            self._prewarmer = None
+            # Close the prewarmed connection if no client borrowed it.
+            self.import_module("create_client").get_connection_pool().clear()
         unpatch_environment()
@@ -8,16 +8,51 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
-from .create_client import CreateClient
+from .connection_pool import ConnectionPool, get_connection_pool
+from .metrics import Metrics
+from .prewarm import ConnectionPrewarmer
 from .create_utils import (
     get_shotgun_create_path,
     launch_shotgun_create,
+    start_shotgun_create,
     is_create_installed,
+    CreateProcess,
 )
 
+import importlib
 import time
 import webbrowser
 
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+# Attributes imported on first use, since their modules import the vendored packages,
+# which is slow. Importing the framework stays cheap for the processes not using it.
+_LAZY_ATTRIBUTES = {
+    "CreateClient": ".create_client",
+    "CreateTimeoutError": ".create_client",
+    "AsyncCreateClient": ".async_create_client",
+    "get_available_backends": ".crypto",
+    "get_available_serializers": ".serializer",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name)
+        )
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 def is_create_running(sg_connection=None):
     """
@@ -29,9 +64,24 @@ def is_create_running(sg_connection=None):
     :returns: ``True`` if Shotgun Create is running, ``False`` if not.
     :rtype: bool
     """
+    from .connection_pool import ping_connection
+    from .create_client import CreateClient
+
     try:
-        CreateClient(sg_connection)
-        return True
+        # Give the handshaken connection back to the pool so the next client is fast.
+        with CreateClient(sg_connection) as client:
+            with client._lock:
+                # A borrowed connection may have been closed by the server without the
+                # pool noticing yet, only an answer from the server proves it's running.
+                if ping_connection(
+                    client._desktop_connection, get_connection_pool().ping_timeout
+                ):
+                    client._last_activity = time.monotonic()
+                    return True
+                client._drop_connection(graceful=False)
+                # The handshake of a new connection gets answers from the server.
+                client._get_connection()
+                return True
     except Exception:
         return False
 
@@ -42,7 +92,8 @@ def ensure_create_server_is_running(sg_connection=None, retry_count=30):
 
     This is an helper function that starts Shotgun Create with the right
     Shotgun Session if Create is not running and wait up to ``retry_count``
-    seconds for the WebSocket server to be initialized.
+    seconds for the WebSocket server to be initialized. It gives up as soon as the
+    Shotgun Create process exits.
 
     :param Shotgun sg_connection: Shotgun connection to use with the CreateClient.
             If not set, the connection from the current bundle is used.
@@ -55,18 +106,99 @@ def ensure_create_server_is_running(sg_connection=None, retry_count=30):
     if is_create_running(sg_connection):
         return True
 
-    launch_status = launch_shotgun_create(sg_connection)
+    # Concurrent callers share the same Shotgun Create process.
+    process = start_shotgun_create(sg_connection)
+    if process is None:
+        return False
+
+    client = wait_for_create_client(sg_connection, timeout=retry_count, process=process)
+    if client is None:
+        return False
+
+    # Give the handshaken connection back to the pool so the next client is fast.
+    client.close()
+    return True
 
-    if not launch_status:
-        return launch_status
 
-    for _ in range(0, retry_count):
-        time.sleep(1)
+def wait_for_create_client(
+    sg_connection=None, timeout=30.0, min_delay=0.05, max_delay=1.0, process=None
+):
+    """
+    Wait for the Shotgun Create WebSocket server to be ready and connect to it.
 
-        if is_create_running(sg_connection):
-            return True
+    The server port is probed with a plain TCP connection, which is cheap, and the delay
+    between the probes doubles from ``min_delay`` up to ``max_delay``. The websocket
+    connection and the server handshake are only done once the port accepts connections.
 
-    return False
+    :param Shotgun sg_connection: Shotgun connection to use with the CreateClient.
+            If not set, the connection from the current bundle is used.
+
+    :param float timeout: Amount of seconds to wait for the server.
+    :param float min_delay: Amount of seconds to wait after the first failed probe.
+    :param float max_delay: Maximum amount of seconds to wait between two probes.
+    :param CreateProcess process: Shotgun Create process started by
+        :func:`start_shotgun_create`. The wait stops as soon as it exits with an error.
+        If it writes a ready file, which Shotgun Create doesn't do yet, the port written
+        in the file is used over the one in the Shotgun preferences.
+
+    :returns: A connected :class:`CreateClient`, or ``None`` if the server wasn't ready
+        before the timeout, the process exited or the client couldn't be built.
+    :rtype: CreateClient
+    """
+    from .create_client import CreateClient
+
+    deadline = time.monotonic() + timeout
+    delay = min_delay
+
+    # The port is read from the Shotgun preferences once.
+    try:
+        client = CreateClient(sg_connection, connect=False)
+    except Exception as e:
+        logger.debug("Unable to build the Create client: {0}".format(str(e)))
+        return None
+    port_checked = False
+    ready = None
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            client.close()
+            return None
+
+        if process is not None:
+            # A launcher handing over to the application exits successfully, only a
+            # failure means the server will never come up.
+            if process.returncode and process.read_ready_file() is None:
+                logger.debug(
+                    "Shotgun Create exited with code {0}.".format(process.returncode)
+                )
+                client.close()
+                return None
+
+            if ready is None:
+                ready = process.read_ready_file()
+                if ready is not None and ready.get("websocket_port"):
+                    # Create knows the port better than the preferences do.
+                    port_checked = True
+                    client.shotgun_create_websocket_port = ready["websocket_port"]
+
+        listening = client._is_server_listening(timeout=min(remaining, max_delay))
+        if not listening and not port_checked and client._port_from_cache:
+            # Make sure we are not waiting on an outdated port.
+            port_checked = True
+            client._refresh_websocket_port()
+
+        if listening:
+            try:
+                # Builds the connection and does the handshake, within the timeout.
+                client._get_connection(deadline)
+                return client
+            except Exception:
+                # The server may accept connections before it is able to handshake.
+                pass
+
+        time.sleep(max(0, min(delay, deadline - time.monotonic())))
+        delay = min(delay * 2, max_delay)
 
 
 def open_shotgun_create_download_page(sg_connection):
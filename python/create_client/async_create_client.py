@@ -0,0 +1,194 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import asyncio
+import functools
+
+import sgtk
+
+from .create_client import CreateClient, CreateTimeoutError
+from .multiplexer import Multiplexer
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+class AsyncCreateClient(object):
+    """
+    asyncio version of the :class:`CreateClient`.
+
+    The requests are multiplexed on a single connection, so many of them can be awaited
+    concurrently. The blocking work (Shotgun requests, connection, encryption and sending)
+    runs in an executor and the replies are routed by the reader thread of the connection,
+    so awaiting a reply doesn't hold an executor thread.
+
+    Usage::
+
+        async with AsyncCreateClient(sg_connection) as client:
+            replies = await asyncio.gather(
+                client.call_server_method("list_supported_commands"),
+                client.call_server_method("sgc_open_task_board", {"project_id": 65}),
+            )
+    """
+
+    def __init__(self, sg_connection=None, port_override=None, executor=None, **kwargs):
+        """
+        Nothing is sent to Shotgun or to the WebSocket server until :meth:`connect` or the
+        first call.
+
+        :param Shotgun sg_connection: Shotgun connection to use with this client.
+                If not set, the connection from the current bundle is used.
+
+        :param int port_override: The port number used for the connection. If not set,
+                the value from Shotgun preferences or a default value is used
+
+        :param concurrent.futures.Executor executor: Executor running the blocking work.
+                If not set, the default executor of the event loop is used.
+
+        Other keyword arguments are passed to the :class:`CreateClient`.
+        """
+        self._shotgun_connection = (
+            sg_connection or sgtk.platform.current_bundle().shotgun
+        )
+        self._port_override = port_override
+        self._executor = executor
+        self._client_kwargs = kwargs
+        self._client = None
+        self._connect_lock = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """
+        Build a client and connect it.
+
+        Takes the same arguments as the constructor.
+
+        :returns: A connected client.
+        :rtype: AsyncCreateClient
+        """
+        client = cls(*args, **kwargs)
+        await client.connect()
+        return client
+
+    async def connect(self):
+        """
+        Build the connection to the WebSocket server and do the handshake, if not already
+        connected.
+        """
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._is_connected:
+                return
+
+            if self._client is None:
+                # Reading the port from the Shotgun preferences is a blocking request.
+                self._client = await self._run(
+                    CreateClient,
+                    self._shotgun_connection,
+                    self._port_override,
+                    multiplexed=True,
+                    connect=False,
+                    **self._client_kwargs,
+                )
+
+            client = self._client
+            client._drop_connection()
+
+            if not await self._run(client._restore_pooled_session):
+                client._connection = await self._run(client._open_connection)
+                await self._do_websocketserver_handshake()
+
+            with client._multiplexer_lock:
+                client._multiplexer = Multiplexer(client, client._connection)
+
+            # Fill the user cache so the calls don't have to wait for Shotgun.
+            await self._run(client._get_user_context)
+
+    async def call_server_method(self, name, data=None, timeout=None):
+        """
+        Make a call to a WebSocket server method and return the reply as a python dict.
+
+        Cancelling the task awaiting the call cancels the call, its reply is dropped when
+        it comes.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+        :param float timeout: Amount of seconds to wait for the reply. If not set, the
+            ``call_timeout`` of the client is used.
+
+        :returns: Reply from the server as a python object (reply json is part).
+        :rtype: dict
+        :raises CreateTimeoutError: If the reply didn't come in time.
+        """
+        await self.connect()
+        timeout = self._client._call_timeout if timeout is None else timeout
+        future = await self._run(self._client.call_server_method_async, name, data)
+        try:
+            # Cancels the future on timeout.
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise CreateTimeoutError(
+                "No reply to {0} within {1} seconds.".format(name, timeout)
+            )
+
+    async def close(self):
+        """
+        Release the websocket connection, see :meth:`CreateClient.close`.
+        """
+        if self._client is not None:
+            await self._run(self._client.close)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def _is_connected(self):
+        """
+        ``True`` if the multiplexer of the connection is running.
+        """
+        return (
+            self._client is not None
+            and self._client._multiplexer is not None
+            and self._client._multiplexer.is_running
+        )
+
+    async def _do_websocketserver_handshake(self):
+        """
+        Execute the websocket server handshake on the connection of the client.
+
+        This runs the steps of :meth:`CreateClient._do_websocketserver_handshake`, each of
+        them in the executor.
+        """
+        steps = self._client._iter_websocketserver_handshake()
+        step = next(steps)
+        while step is not None:
+            try:
+                await self._run(step)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = next(steps, None)
+
+    def _run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the executor.
+
+        :returns: Future resolved with the result of the function.
+        :rtype: asyncio.Future
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
@@ -0,0 +1,231 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import collections
+import json
+import os
+import threading
+import time
+
+import sgtk
+from sgtk.util import LocalFileStorageManager
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+class TTLCache(object):
+    """
+    Thread safe key/value cache where every entry expires after a given amount of time.
+
+    The cache can be bounded, the least recently used entries are then evicted to make
+    room for the new ones.
+    """
+
+    def __init__(self, ttl, maxsize=None):
+        """
+        :param float ttl: Default time to live of an entry, in seconds. ``None`` means
+            entries never expire.
+        :param int maxsize: Maximum amount of entries. ``None`` means the cache is not
+            bounded.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get the value stored for a key.
+
+        :param key: Key of the entry.
+        :param default: Value returned if the entry is missing or expired.
+
+        :returns: The cached value or ``default``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, expiry = entry
+            if expiry is not None and expiry <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            if self.maxsize is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value.
+
+        :param key: Key of the entry.
+        :param value: Value to store.
+        :param float ttl: Time to live of this entry, in seconds. If not set, the
+            cache default is used.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expiry = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expiry)
+            if self.maxsize is not None:
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Remove an entry from the cache.
+
+        :param key: Key of the entry to remove. If not set, the whole cache is cleared.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class DiskCache(object):
+    """
+    Key/value cache persisted in a JSON file, so entries survive process restarts.
+
+    Entries expire after a given amount of time. The file is only readable by the
+    current user. A cache file that can't be read or written is treated as empty, the
+    cache never makes the caller fail.
+    """
+
+    def __init__(self, path, ttl):
+        """
+        :param str path: Path of the cache file.
+        :param float ttl: Default time to live of an entry, in seconds. ``None`` means
+            entries never expire.
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get the value stored for a key.
+
+        :param str key: Key of the entry.
+        :param default: Value returned if the entry is missing or expired.
+
+        :returns: The cached value or ``default``.
+        """
+        with self._lock:
+            entry = self._read().get(key)
+
+        if entry is None:
+            return default
+
+        expiry = entry.get("expiry")
+        if expiry is not None and expiry <= time.time():
+            return default
+
+        return entry.get("value", default)
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value.
+
+        :param str key: Key of the entry.
+        :param value: JSON serializable value to store.
+        :param float ttl: Time to live of this entry, in seconds. If not set, the
+            cache default is used.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+
+        with self._lock:
+            entries = self._read()
+            # Drop the expired entries so the file doesn't grow forever.
+            entries = dict(
+                (k, entry)
+                for k, entry in entries.items()
+                if entry.get("expiry") is None or entry["expiry"] > now
+            )
+            entries[key] = {
+                "value": value,
+                "expiry": None if ttl is None else now + ttl,
+            }
+            self._write(entries)
+
+    def invalidate(self, key=None):
+        """
+        Remove an entry from the cache.
+
+        :param str key: Key of the entry to remove. If not set, the whole cache is cleared.
+        """
+        with self._lock:
+            if key is None:
+                entries = {}
+            else:
+                entries = self._read()
+                if entries.pop(key, None) is None:
+                    return
+            self._write(entries)
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.path):
+                logger.debug("Failed to read {0}: {1}".format(self.path, str(e)))
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries):
+        # The file is written next to its final location and moved in place, so readers
+        # in other processes never see a partial file.
+        tmp_path = "{0}.{1}.tmp".format(self.path, os.getpid())
+        try:
+            folder = os.path.dirname(self.path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder, 0o700)
+
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.debug("Failed to write {0}: {1}".format(self.path, str(e)))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def get_cache_path(name):
+    """
+    Get the path of a file in the framework cache folder.
+
+    :param str name: Name of the file.
+
+    :returns: Path in the Toolkit global cache folder.
+    :rtype: str
+    """
+    root = LocalFileStorageManager.get_global_root(LocalFileStorageManager.CACHE)
+    return os.path.join(root, "tk-framework-desktopclient", name)
+
+
+_MISSING = object()
@@ -0,0 +1,274 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import binascii
+import os
+import select
+import ssl
+import threading
+import time
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+class PooledSession(object):
+    """
+    A websocket connection on which the server handshake has already been done, along
+    with the state negotiated during that handshake.
+    """
+
+    def __init__(
+        self,
+        connection,
+        server_id,
+        secret,
+        protocol_version,
+        last_used=None,
+        supported_commands=None,
+    ):
+        """
+        :param WebSocket connection: Connection to the Shotgun WebSocket server.
+        :param str server_id: Id of the WebSocket server.
+        :param Fernet secret: Secret used to encrypt the communications.
+        :param int protocol_version: Protocol version of the WebSocket server.
+        :param float last_used: Time of the last frame sent or received on the connection,
+            as given by :func:`time.monotonic`. If not set, the current time is used.
+        :param list supported_commands: Commands listed by the WebSocket server.
+        """
+        self.connection = connection
+        self.server_id = server_id
+        self.secret = secret
+        self.protocol_version = protocol_version
+        self.last_used = time.monotonic() if last_used is None else last_used
+        self.supported_commands = supported_commands
+
+    def close(self):
+        """
+        Close the underlying websocket connection.
+        """
+        try:
+            self.connection.close()
+        except Exception as e:
+            logger.debug("Failed to close a pooled connection: {0}".format(str(e)))
+
+
+class ConnectionPool(object):
+    """
+    Process wide pool of handshaken connections to Shotgun WebSocket servers.
+
+    Sessions are keyed by ``(site, user login, port)`` so a connection is never shared
+    between users or sites.
+    """
+
+    DEFAULT_IDLE_TIMEOUT = 60
+    DEFAULT_MAX_IDLE_PER_KEY = 4
+    # Sessions used more recently than this amount of seconds are not pinged when borrowed.
+    DEFAULT_LIVENESS_INTERVAL = 5
+    # Amount of seconds to wait for the server to answer a ping.
+    DEFAULT_PING_TIMEOUT = 1.0
+
+    def __init__(
+        self,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        max_idle_per_key=DEFAULT_MAX_IDLE_PER_KEY,
+        liveness_interval=DEFAULT_LIVENESS_INTERVAL,
+        ping_timeout=DEFAULT_PING_TIMEOUT,
+    ):
+        """
+        :param float idle_timeout: Amount of seconds an unused session is kept.
+        :param int max_idle_per_key: Maximum amount of unused sessions kept per key.
+        :param float liveness_interval: Sessions that exchanged a frame more recently than
+            this amount of seconds are only checked for a close by the server, without
+            pinging it.
+        :param float ping_timeout: Amount of seconds to wait for the server to answer
+            the ping of a session.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self.liveness_interval = liveness_interval
+        self.ping_timeout = ping_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Borrow a session from the pool.
+
+        The session is removed from the pool until it is released. Sessions that are
+        no longer valid are closed and skipped.
+
+        :param tuple key: ``(site, user login, port)`` of the session.
+
+        :returns: A session or ``None`` if no valid session is available.
+        :rtype: PooledSession
+        """
+        self.evict_idle()
+
+        while True:
+            with self._lock:
+                sessions = self._sessions.get(key)
+                if not sessions:
+                    return None
+                # Most recently used first, it is the most likely to still be alive.
+                session = sessions.pop()
+
+            if self._is_alive(session):
+                return session
+
+            session.close()
+
+    def release(self, key, session):
+        """
+        Give a session back to the pool so other clients can reuse it.
+
+        :param tuple key: ``(site, user login, port)`` of the session.
+        :param PooledSession session: Session to give back.
+        """
+        with self._lock:
+            sessions = self._sessions.setdefault(key, [])
+            sessions.append(session)
+            extra_sessions = sessions[: -self.max_idle_per_key]
+            del sessions[: -self.max_idle_per_key]
+
+        for extra_session in extra_sessions:
+            extra_session.close()
+
+        self.evict_idle()
+
+    def evict_idle(self):
+        """
+        Close the sessions that were unused for more than ``idle_timeout`` seconds.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        expired_sessions = []
+
+        with self._lock:
+            for key in list(self._sessions):
+                sessions = self._sessions[key]
+                expired_sessions.extend(s for s in sessions if s.last_used < deadline)
+                sessions[:] = [s for s in sessions if s.last_used >= deadline]
+                if not sessions:
+                    del self._sessions[key]
+
+        for session in expired_sessions:
+            logger.debug("Closing idle connection to {0}".format(session.server_id))
+            session.close()
+
+    def clear(self):
+        """
+        Close all the sessions of the pool.
+        """
+        with self._lock:
+            sessions = [s for key in self._sessions for s in self._sessions[key]]
+            self._sessions.clear()
+
+        for session in sessions:
+            session.close()
+
+    def _is_alive(self, session):
+        """
+        Check that a session can still be used.
+
+        :param PooledSession session: Session to check.
+
+        :returns: ``True`` if the server didn't close the session and, unless the session
+            was recently used, if the server answered a ping. ``False`` otherwise.
+        :rtype: bool
+        """
+        if is_idle_connection_closed(session.connection):
+            logger.debug("Discarding a pooled connection closed by the server.")
+            return False
+
+        if time.monotonic() - session.last_used < self.liveness_interval:
+            return True
+
+        if not ping_connection(session.connection, self.ping_timeout):
+            return False
+
+        session.last_used = time.monotonic()
+        return True
+
+
+def is_idle_connection_closed(connection):
+    """
+    Check, without blocking, if the server closed an idle connection.
+
+    Nothing is expected from the server on an idle connection, so anything to read means
+    the server closed it, or sent a frame nobody would read. A closed socket still accepts
+    writes, so sending a frame is not enough to find out.
+
+    :param WebSocket connection: Connection nobody is reading.
+
+    :returns: ``True`` if the connection can't be used anymore.
+    :rtype: bool
+    """
+    sock = connection.sock
+    if sock is None:
+        return True
+
+    try:
+        # Data already decrypted by the SSL layer doesn't make the socket readable.
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def ping_connection(connection, timeout):
+    """
+    Ping the server on an idle connection and wait for its pong.
+
+    :param WebSocket connection: Connection nobody is reading.
+    :param float timeout: Amount of seconds to wait for the pong.
+
+    :returns: ``True`` if the server answered in time, ``False`` otherwise. The
+        connection must be closed in the latter case.
+    :rtype: bool
+    """
+    # Already imported by the client owning the connection, the vendored packages are
+    # not imported with the framework.
+    import websocket
+
+    token = binascii.hexlify(os.urandom(8))
+    previous_timeout = connection.gettimeout()
+    try:
+        connection.settimeout(timeout)
+        connection.ping(token)
+        while True:
+            opcode, data = connection.recv_data(control_frame=True)
+            if opcode == websocket.ABNF.OPCODE_PONG and data == token:
+                connection.settimeout(previous_timeout)
+                return True
+            if opcode != websocket.ABNF.OPCODE_PONG:
+                # Closed, or a frame nobody is waiting for.
+                logger.debug(
+                    "Unexpected frame on an idle connection: {0}".format(opcode)
+                )
+                return False
+    except Exception as e:
+        logger.debug("The server didn't answer the ping: {0}".format(str(e)))
+        return False
+
+
+_connection_pool = ConnectionPool()
+
+
+def get_connection_pool():
+    """
+    Get the connection pool shared by all the clients of the process.
+
+    :returns: The process wide connection pool.
+    :rtype: ConnectionPool
+    """
+    return _connection_pool
@@ -8,25 +8,142 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import concurrent.futures
+import contextlib
+import functools
 import json
+import queue
+import socket
+import threading
 import time
 import ssl
+import zlib
+from urllib.parse import urlparse
 
 # Coming from the vendors folder
 import websocket
-from fernet import Fernet
 
 import sgtk
 
+from .cache import DiskCache, TTLCache, get_cache_path
+from .crypto import create_fernet
+from .serializer import create_serializer
+from .connection_pool import (
+    PooledSession,
+    get_connection_pool,
+    is_idle_connection_closed,
+)
+from .multiplexer import Multiplexer
+from .notifier import Notifier
+from .events import EventDispatcher
+from .frames import send_frame
+
 logger = sgtk.LogManager.get_logger(__name__)
 
+# Errors meaning that the connection to the server is lost.
+CONNECTION_ERRORS = (websocket.WebSocketConnectionClosedException, OSError)
+
+# Errors raised when the server doesn't answer in time.
+TIMEOUT_ERRORS = (websocket.WebSocketTimeoutException, socket.timeout)
+
+# Serialized message, formatted with the protocol version, the message id, the command
+# name and data, the timestamp and the optional fields.
+MESSAGE_TEMPLATE = (
+    b'{"protocol_version":%s,"id":%d,'
+    b'"command":{"name":%s,"data":%s},"timestamp":%d%s}'
+)
+
+# First byte of the zlib streams compressed by the client and the server.
+ZLIB_HEADER = b"\x78"
+
+
+class CreateTimeoutError(RuntimeError):
+    """
+    Raised when the WebSocket server doesn't answer in time.
+    """
+
 
 class CreateClient(object):
     SG_CREATE_SETTINGS_KEY = "view_master_settings"
     SG_CREATE_WEBSOCKET_PORT_KEY = "websocket_port"
     SG_CREATE_DEFAULT_WEBSOCKET_PORT = 9006
+    SG_CREATE_WEBSOCKET_URL = "wss://shotgunlocalhost.com:{0}"
+
+    # Amount of seconds the HumanUser information sent with every command is cached.
+    USER_CONTEXT_TTL = 300
+
+    # Amount of seconds the WebSocket server port of a site is cached. A cached port is
+    # read again from Shotgun if the connection to it fails.
+    WEBSOCKET_PORT_TTL = 24 * 3600
+
+    # If True, the WebSocket server ports are also cached on disk so they survive the
+    # process. This helps short lived processes like command line tools.
+    PERSIST_WEBSOCKET_PORT = True
+
+    # Amount of seconds the secret of a WebSocket server is cached. A cached secret is
+    # fetched again from Shotgun if the handshake fails with it.
+    WEBSOCKET_SERVER_SECRET_TTL = 7 * 24 * 3600
+
+    # If True, the WebSocket server secrets are also cached on disk, in a file only
+    # readable by the current user, so reconnecting doesn't need Shotgun.
+    PERSIST_WEBSOCKET_SERVER_SECRET = True
+
+    # Amount of server events that can wait for their handlers, and amount of seconds
+    # the reader thread waits for room in the queue before dropping an event.
+    EVENT_QUEUE_SIZE = 1000
+    EVENT_QUEUE_TIMEOUT = 1.0
+
+    # Pseudo command listed by the servers accepting zlib compressed messages.
+    COMPRESSION_CAPABILITY = "zlib_compression"
+    # Messages smaller than this amount of bytes are not worth compressing.
+    COMPRESSION_THRESHOLD = 8 * 1024
+    COMPRESSION_LEVEL = 1
+
+    # Pseudo command listed by the servers able to send a reply in several chunks.
+    CHUNKED_REPLIES_CAPABILITY = "chunked_replies"
+    # Amount of items the server is asked to send in every chunk of a reply.
+    CHUNK_SIZE = 1000
+
+    # Pseudo command listed by the servers accepting binary frames, which they don't
+    # have to validate as UTF-8.
+    BINARY_FRAMES_CAPABILITY = "binary_frames"
+
+    # Amount of requests, and of bytes of requests, a lock-step batch sends before reading
+    # the replies already due. The server blocks writing replies nobody reads, and stops
+    # reading the requests, past what the socket buffers hold.
+    BATCH_WINDOW_SIZE = 32
+    BATCH_WINDOW_BYTES = 256 * 1024
+
+    # Amount of seconds the replies of the cached commands are kept, and maximum amount
+    # of replies cached by a client.
+    REPLY_CACHE_TTL = 60
+    REPLY_CACHE_SIZE = 256
+
+    # Amount of seconds to wait for the connection to the WebSocket server, for each step
+    # of the handshake and for the reply of a call. ``None`` means waiting forever.
+    CONNECT_TIMEOUT = 10.0
+    HANDSHAKE_TIMEOUT = 10.0
+    CALL_TIMEOUT = None
+
+    # Connections idle for more than this amount of seconds are checked for a close by
+    # the server before a lock-step request is sent, since a closed socket still accepts
+    # the request and only reading the reply fails.
+    IDLE_CHECK_INTERVAL = 1.0
 
     message_id = 0
+    _message_id_lock = threading.Lock()
+
+    # Shared by all the clients of the process, keyed by site and user login.
+    _user_context_cache = TTLCache(USER_CONTEXT_TTL)
+
+    # Shared by all the clients of the process, keyed by site.
+    _websocket_port_cache = TTLCache(WEBSOCKET_PORT_TTL)
+
+    # Shared by all the clients of the process, keyed by site and WebSocket server ID.
+    _websocket_server_secret_cache = TTLCache(WEBSOCKET_SERVER_SECRET_TTL)
+
+    # On disk caches, keyed by file name.
+    _disk_caches = {}
 
     @classmethod
     def _get_next_message_id(cls):
@@ -36,10 +153,29 @@ class CreateClient(object):
         :returns: Message id
         :rtype: int
         """
-        cls.message_id += 1
-        return cls.message_id
-
-    def __init__(self, sg_connection=None, port_override=None):
+        with CreateClient._message_id_lock:
+            CreateClient.message_id += 1
+            return CreateClient.message_id
+
+    def __init__(
+        self,
+        sg_connection=None,
+        port_override=None,
+        user_context_ttl=None,
+        use_pool=True,
+        multiplexed=False,
+        connect=True,
+        crypto_backend=None,
+        metrics=None,
+        compression=True,
+        serializer=None,
+        validate_commands=False,
+        cached_commands=None,
+        reply_cache_ttl=None,
+        connect_timeout=None,
+        handshake_timeout=None,
+        call_timeout=None,
+    ):
         """
         Builds a WebSocket client used to send requests to a Shotgun WebSocket server such as
         Shotgun Create.
@@ -57,13 +193,116 @@ class CreateClient(object):
 
         :param int port_override: The port number used for the connection. If not set,
                 the value from Shotgun preferences or a default value is used
+
+        :param float user_context_ttl: Amount of seconds the user information sent along
+                with every command is cached. If not set, ``USER_CONTEXT_TTL`` is used.
+                Use ``0`` to look up the user on every call.
+
+        :param bool use_pool: If ``True``, an already handshaken connection is borrowed from
+                the process wide connection pool when available and :meth:`close` gives the
+                connection back to the pool.
+
+        :param bool multiplexed: If ``True``, requests are sent without waiting for the
+                previous replies and a reader thread routes the replies to the callers
+                using the message id. This allows many requests to be in flight at once,
+                see :meth:`call_server_method_async`.
+
+        :param bool connect: If ``True``, the connection is built and the handshake is done
+                right away. Otherwise this happens on the first call to the server.
+
+        :param str crypto_backend: Name of the Fernet implementation used to encrypt the
+                communications, see :func:`get_available_backends`. If not set, the
+                ``cryptography`` package is used when available and the vendored
+                implementation otherwise.
+
+        :param Metrics metrics: Collects the timing of every phase of the calls and
+                handshake, see :class:`Metrics`. If not set, nothing is measured.
+
+        :param bool compression: If ``True`` and the server supports it, messages larger
+                than ``COMPRESSION_THRESHOLD`` bytes are compressed before being encrypted,
+                and the server is told it can compress its replies.
+
+        :param str serializer: Name of the JSON implementation used for the messages, see
+                :func:`get_available_serializers`. If not set, ``orjson`` is used when
+                available and the ``json`` module otherwise.
+
+        :param bool validate_commands: If ``True``, calling a server method the server
+                doesn't list in :attr:`supported_commands` raises a ``RuntimeError``
+                without sending anything.
+
+        :param list cached_commands: Names of the server methods only reading data. Their
+                replies are cached, by arguments, for ``reply_cache_ttl`` seconds, and
+                the least recently used replies are evicted past ``REPLY_CACHE_SIZE``.
+
+        :param float reply_cache_ttl: Amount of seconds the replies of the
+                ``cached_commands`` are cached. If not set, ``REPLY_CACHE_TTL`` is used.
+
+        :param float connect_timeout: Amount of seconds to wait for the connection to the
+                WebSocket server. If not set, ``CONNECT_TIMEOUT`` is used.
+
+        :param float handshake_timeout: Amount of seconds to wait for each reply of the
+                handshake. If not set, ``HANDSHAKE_TIMEOUT`` is used.
+
+        :param float call_timeout: Default amount of seconds to wait for the reply of a
+                call, see :meth:`call_server_method`. If not set, ``CALL_TIMEOUT`` is used.
         """
         super().__init__()
 
         self._connection = None
+        self._last_activity = None
+        self._in_handshake = False
+        self._use_pool = use_pool
+        self._multiplexed = multiplexed
+        self._crypto_backend = crypto_backend
+        self.metrics = metrics
+        self._multiplexer = None
+        self._multiplexer_lock = threading.Lock()
+        # Serializes the use of the connection in lock-step mode, where a reply is read
+        # right after its request.
+        self._lock = threading.RLock()
+        self._notifier = None
+        self._notifier_lock = threading.Lock()
+        self._event_dispatcher = None
+        self._event_lock = threading.Lock()
+        self._user_context_ttl = (
+            CreateClient.USER_CONTEXT_TTL
+            if user_context_ttl is None
+            else user_context_ttl
+        )
+        self._user_context_owner = None
         self._server_id = None
         self._secret = None
         self._protocol_version = None
+        self._supported_commands = None
+        self._compression = compression
+        self._serializer = create_serializer(serializer)
+        self._validate_commands = validate_commands
+        self._connect_timeout = (
+            CreateClient.CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        )
+        self._handshake_timeout = (
+            CreateClient.HANDSHAKE_TIMEOUT
+            if handshake_timeout is None
+            else handshake_timeout
+        )
+        self._call_timeout = (
+            CreateClient.CALL_TIMEOUT if call_timeout is None else call_timeout
+        )
+        # Set by cancel_calls to interrupt the lock-step call in flight.
+        self._cancel_requested = False
+        self._cached_commands = frozenset(cached_commands or [])
+        self._reply_cache = TTLCache(
+            (
+                CreateClient.REPLY_CACHE_TTL
+                if reply_cache_ttl is None
+                else reply_cache_ttl
+            ),
+            maxsize=CreateClient.REPLY_CACHE_SIZE,
+        )
+        # Last user block sent and its serialized form.
+        self._user_context_json = None
+        self._port_from_cache = False
+        self._secret_from_cache = False
         self._shotgun_connection = (
             sg_connection or sgtk.platform.current_bundle().shotgun
         )
@@ -77,234 +316,1814 @@ class CreateClient(object):
         if port_override is not None:
             self.shotgun_create_websocket_port = port_override
         else:
-            # Grab the WebSocket server port from Shotgun
-            prefs = self._shotgun_connection.preferences_read()
-            sg_create_prefs = json.loads(
-                prefs.get(CreateClient.SG_CREATE_SETTINGS_KEY, {})
-            )
-            self.shotgun_create_websocket_port = sg_create_prefs.get(
-                CreateClient.SG_CREATE_WEBSOCKET_PORT_KEY,
-                CreateClient.SG_CREATE_DEFAULT_WEBSOCKET_PORT,
-            )
+            self.shotgun_create_websocket_port = self._get_websocket_port()
 
         # Initialize the connection
-        if self._desktop_connection is None:
+        if connect and self._desktop_connection is None:
             raise RuntimeError("Unable to build the WebSocket connection.")
 
-    def call_server_method(self, name, data=None):
+    def close(self):
+        """
+        Release the websocket connection.
+
+        If the client uses the connection pool, the connection is given back to the pool
+        so another client can reuse it without doing the handshake again. Otherwise the
+        connection is closed.
+
+        The commands sent with :meth:`notify` are sent before the connection is released.
+        The handlers subscribed to the server events are unsubscribed.
+
+        The client can still be used after this call, a new connection is built on demand.
+        """
+        with self._notifier_lock:
+            notifier, self._notifier = self._notifier, None
+        if notifier is not None and not notifier.stop():
+            logger.debug("Released the connection with notifications still in flight.")
+
+        with self._lock:
+            self._close()
+
+        with self._event_lock:
+            dispatcher, self._event_dispatcher = self._event_dispatcher, None
+        if dispatcher is not None:
+            dispatcher.stop()
+
+    def _close(self):
+        """
+        Release the websocket connection, see :meth:`close`.
+        """
+        multiplexer, self._multiplexer = self._multiplexer, None
+        if multiplexer is not None and not multiplexer.stop():
+            # Replies are still expected on this connection, it can't be reused.
+            self._drop_connection()
+
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+
+        session = PooledSession(
+            connection,
+            self._server_id,
+            self._secret,
+            self._protocol_version,
+            last_used=self._last_activity,
+            supported_commands=self._supported_commands,
+        )
+        if self._use_pool and self._secret is not None:
+            get_connection_pool().release(self._connection_key, session)
+        else:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def call_server_method(self, name, data=None, timeout=None):
         """
         Make a call to a WebSocket server method and return the reply as a python dict.
 
+        The client can be shared between threads. In lock-step mode the calls of the
+        threads wait for each other, in multiplexed mode they share the connection
+        without waiting.
+
         :param str name: Name of the server method
         :param dict data: Arguments of the server method (default: {None})
+        :param float timeout: Amount of seconds to wait for the reply. If not set, the
+            ``call_timeout`` of the client is used. In lock-step mode, the connection is
+            closed when the call times out so the late reply can't be read by the next
+            call. In multiplexed mode the late reply is dropped.
 
         :returns: Reply from the server as a python object (reply json is part).
         :rtype: dict
+        :raises CreateTimeoutError: If the reply didn't come in time.
         """
+        timeout = self._call_timeout if timeout is None else timeout
+
+        if self._multiplexed:
+            future = self.call_server_method_async(name, data)
+            try:
+                return future.result(timeout)
+            except concurrent.futures.TimeoutError:
+                # The late reply is dropped by the multiplexer.
+                future.cancel()
+                if self.metrics is not None:
+                    self.metrics.increment("timeouts")
+                raise CreateTimeoutError(
+                    "No reply to {0} within {1} seconds.".format(name, timeout)
+                )
+
+        cache_key = self._reply_cache_key(name, data)
+        if cache_key is not None:
+            cached = self._get_cached_reply(cache_key)
+            if cached is not None:
+                return self._serializer.loads(cached)
+
+        raw_resp = self._call_server_method(name, data, timeout)
+
         # Get the server method as a Dict
-        resp = json.loads(self._call_server_method(name, data))
-        return resp.get("reply", "")
+        with self._timer("decode"):
+            resp = self._serializer.loads(raw_resp)
+
+        reply = resp.get("reply", "")
+        # Nothing is cached when no reply could be read.
+        if cache_key is not None and "reply" in resp:
+            self._reply_cache.set(cache_key, self._serializer.dumps(reply))
+        return reply
+
+    def call_server_method_async(self, name, data=None):
+        """
+        Send a request to a WebSocket server method without waiting for the reply.
+
+        The request is sent right away and the reply is routed to the returned future by the
+        reader thread, so many requests can be in flight on the same connection and their
+        replies can come back in any order.
+
+        Cancelling the future stops waiting for the reply, which is dropped when it comes.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+
+        :returns: Future resolved with the reply from the server as a python object.
+        :rtype: concurrent.futures.Future
+        """
+        cache_key = self._reply_cache_key(name, data)
+        if cache_key is not None:
+            cached = self._get_cached_reply(cache_key)
+            if cached is not None:
+                future = concurrent.futures.Future()
+                future.set_result(self._serializer.loads(cached))
+                return future
+
+        # The message carries the protocol version negotiated by the handshake.
+        self._get_multiplexer()
+        message_id, payload = self._build_message(name, data)
+        future = self._submit(message_id, payload)
+
+        if cache_key is not None:
+            future.add_done_callback(lambda f: self._cache_reply_future(cache_key, f))
+        return future
 
     @property
-    def _desktop_connection(self):
+    def supported_commands(self):
         """
-        Return the currently active websocket connection to the Shotgun WebSocket server.
+        Names of the server methods and capabilities listed by the server during the
+        handshake. The connection is built if needed.
 
-        If there's no active connection, the function builds a new connection and do the
-        handshake so it's ready to use.
+        :rtype: frozenset
+        """
+        if self._supported_commands is None:
+            # Builds the connection and does the handshake, like the calls do, so the
+            # threads don't race to build it.
+            if self._multiplexed:
+                self._get_multiplexer()
+            else:
+                with self._lock:
+                    self._desktop_connection
+        return self._supported_commands
+
+    def supports(self, name):
+        """
+        Check if the server supports a method or a capability, without a round trip.
 
-        :returns: active websocket connection to the Shotgun WebSocket server.
-        :rtype: WebSocket
+        :param str name: Name of the server method or of the capability.
+
+        :returns: ``True`` if the server listed it during the handshake.
+        :rtype: bool
+        """
+        return name in (self.supported_commands or ())
+
+    def invalidate_reply_cache(self):
+        """
+        Forget the cached replies, see ``cached_commands``.
+        """
+        self._reply_cache.invalidate()
+
+    def _reply_cache_key(self, name, data):
+        """
+        Get the key of the cached reply of a call.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method.
+
+        :returns: The key, or ``None`` if the replies of the method are not cached.
+        """
+        if name not in self._cached_commands:
+            return None
+        return (name, self._serializer.dumps(data) if data else b"{}")
+
+    def _get_cached_reply(self, cache_key):
+        """
+        :returns: The serialized cached reply, or ``None``.
+        :rtype: bytes
+        """
+        cached = self._reply_cache.get(cache_key)
+        if cached is not None and self.metrics is not None:
+            self.metrics.increment("reply_cache_hits")
+        return cached
+
+    def _cache_reply_future(self, cache_key, future):
+        """
+        Cache the reply of a call once its future is resolved.
+        """
+        if not future.cancelled() and future.exception() is None:
+            # Serialized, so the callers can't alter the cached reply.
+            self._reply_cache.set(cache_key, self._serializer.dumps(future.result()))
+
+    def iter_server_method(self, name, data=None, chunk_size=None, timeout=None):
+        """
+        Call a WebSocket server method returning a list and iterate over the items of the
+        reply as they arrive.
+
+        When the server supports it, the reply is sent in chunks of ``chunk_size`` items,
+        and each chunk is decrypted and parsed on its own, so the whole reply is never in
+        memory at once. Otherwise the reply is read at once and its items are yielded.
+
+        The request is sent when the iteration starts. In lock-step mode the client can't
+        be used by other threads until the iteration ends, and stopping the iteration
+        early closes the connection since the remaining chunks can't be skipped.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+        :param int chunk_size: Amount of items in every chunk. If not set,
+            ``CHUNK_SIZE`` is used.
+        :param float timeout: Amount of seconds to wait for each chunk. If not set, the
+            ``call_timeout`` of the client is used.
+
+        :returns: Iterator over the items of the reply. A reply that is not a list is
+            yielded as a single item.
+        :raises CreateTimeoutError: If a chunk didn't come in time.
+        """
+        timeout = self._call_timeout if timeout is None else timeout
+
+        if self._multiplexed:
+            multiplexer = self._get_multiplexer()
+        else:
+            self._lock.acquire()
+
+        try:
+            if not self._multiplexed:
+                self._get_connection(self._get_deadline(timeout), check_idle=True)
+
+            # The capabilities come with the handshake.
+            if not self.supports(self.CHUNKED_REPLIES_CAPABILITY):
+                # The server doesn't know about chunks, read the whole reply at once.
+                reply = self.call_server_method(name, data, timeout)
+                for item in reply if isinstance(reply, list) else [reply]:
+                    yield item
+                return
+
+            message_id, payload = self._build_message(
+                name, data, options={"chunk_size": chunk_size or self.CHUNK_SIZE}
+            )
+            if self._multiplexed:
+                messages = self._iter_multiplexed_chunks(
+                    multiplexer, message_id, payload, timeout
+                )
+            else:
+                messages = self._iter_lock_step_chunks(message_id, payload, timeout)
+
+            for message in messages:
+                chunk = message.get("chunk")
+                if chunk is None:
+                    # The reply came in one piece.
+                    reply = message.get("reply", "")
+                    for item in reply if isinstance(reply, list) else [reply]:
+                        yield item
+                    return
+
+                for item in chunk.get("items", []):
+                    yield item
+        finally:
+            if not self._multiplexed:
+                self._lock.release()
+
+    def _iter_multiplexed_chunks(self, multiplexer, message_id, payload, timeout=None):
+        """
+        Send a request through the multiplexer and iterate over the reply messages.
+
+        :param Multiplexer multiplexer: Multiplexer of the connection.
+        :param int message_id: Id of the message.
+        :param bytes payload: Message to send to the server.
+        :param float timeout: Amount of seconds to wait for each message. If not set,
+            wait forever.
+
+        :returns: Iterator over the parsed messages, until the last chunk.
         """
+        stream = multiplexer.submit_stream(message_id, payload)
         try:
-            if self._connection:
-                # Ping the server to make sure the connection is still valid.
+            while True:
                 try:
-                    self._connection.ping()
-                except RuntimeError as e:
-                    logger.debug(
-                        "Failed to reuse the active connection: {0}".format(str(e))
+                    message = stream.get(timeout=timeout)
+                except queue.Empty:
+                    # The late messages are dropped once the stream is closed.
+                    if self.metrics is not None:
+                        self.metrics.increment("timeouts")
+                    raise CreateTimeoutError(
+                        "No reply chunk within {0} seconds.".format(timeout)
                     )
-                    logger.debug("Destroying the connection.")
-                    self._connection = None
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+                if message.get("chunk", {}).get("last", True):
+                    return
+        finally:
+            multiplexer.close_stream(message_id)
+
+    def _iter_lock_step_chunks(self, message_id, payload, timeout=None):
+        """
+        Send a request and iterate over the reply messages read from the connection.
 
-            if not self._connection:
-                ssl_defaults = ssl.get_default_verify_paths()
+        :param int message_id: Id of the message.
+        :param bytes payload: Message to send to the server.
+        :param float timeout: Amount of seconds to wait for each message. If not set,
+            wait forever.
 
-                self._connection = websocket.create_connection(
-                    "wss://shotgunlocalhost.com:{0}".format(
-                        self.shotgun_create_websocket_port
-                    ),
-                    sslopt={"ca_certs": ssl_defaults.cafile},
+        :returns: Iterator over the parsed messages, until the last chunk.
+        """
+        done = False
+        try:
+            self._send(payload, self._get_deadline(timeout))
+            while True:
+                message = self._serializer.loads(
+                    self._recv(self._get_deadline(timeout))
                 )
+                if not message:
+                    raise RuntimeError("Failed to read a reply chunk.")
+                if message.get("id") != message_id:
+                    logger.debug(
+                        "Dropping a reply with id {0}".format(message.get("id"))
+                    )
+                    continue
+
+                last = message.get("chunk", {}).get("last", True)
+                done = last
+                yield message
+                if last:
+                    return
+        finally:
+            if not done:
+                # The remaining chunks would be read as the replies of the next calls.
+                self._drop_connection()
+
+    def notify(self, name, data=None, callback=None):
+        """
+        Send a command to a WebSocket server method without waiting, for commands whose
+        reply is not needed.
 
-                self._do_websocketserver_handshake()
+        The command is queued and sent from a background thread, so this returns right
+        away even if the connection needs to be built. The reply is read in the
+        background as well, and the command fails if the reply doesn't come within the
+        ``call_timeout`` of the client.
 
-        except Exception as e:
-            logger.debug(
-                "Failed to get a valid websocket connection: {0}".format(str(e))
-            )
-            self._connection = None
-            raise
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+        :param callable callback: Called from a background thread once the command is
+            done, with the reply from the server and the exception raised while sending
+            the command or waiting for the reply, which is ``None`` on success.
+        """
+        with self._notifier_lock:
+            if self._notifier is None or not self._notifier.is_running:
+                self._notifier = Notifier(self, self._call_timeout)
+            notifier = self._notifier
 
-        return self._connection
+        notifier.notify(name, data, callback)
 
-    @property
-    def _current_user(self):
+    def flush_notifications(self, timeout=None):
         """
-        Get the currently authenticated user.
+        Wait for the commands sent with :meth:`notify` to be done.
 
-        :returns: Currently authenticated user.
-        :rtype: ShotgunUser
+        :param float timeout: Amount of seconds to wait. If not set, wait until all the
+            commands are done, which takes forever if the client has no ``call_timeout``
+            and the server doesn't reply.
+
+        :returns: ``True`` if all the commands are done, ``False`` otherwise.
+        :rtype: bool
         """
-        return sgtk.get_authenticated_user()
+        notifier = self._notifier
+        if notifier is None:
+            return True
 
-    def _send(self, payload):
+        return notifier.flush(timeout)
+
+    def subscribe(self, event, handler):
         """
-        Send a payload to the server.
+        Call a handler every time the server pushes an event.
 
-        The payload is encrypted using the WebSocket server secret, if available.
+        The events are read by the reader thread of the client, which is started if
+        needed, and the handlers are called from a dedicated thread. When the handlers
+        are too slow, the events wait in a queue of ``EVENT_QUEUE_SIZE`` events. Once it
+        is full, the reader thread waits up to ``EVENT_QUEUE_TIMEOUT`` seconds for room
+        and drops the event after that.
 
-        :param str payload: Payload to send to the server.
+        The events are only received while the connection is alive. A lost connection is
+        rebuilt on the next call to the server.
+
+        :param str event: Name of the event.
+        :param callable handler: Called with the name of the event and its data.
+
+        :raises RuntimeError: If the client is not multiplexed, since nothing reads the
+            connection between the calls in lock-step mode.
         """
-        try:
-            p = payload if isinstance(payload, bytes) else payload.encode("utf-8")
+        if not self._multiplexed:
+            raise RuntimeError(
+                "Subscribing to server events needs a multiplexed client."
+            )
 
-            # self._secret is expected to be none at the beginning of the connection handshake.
-            if self._secret:
-                p = self._secret.encrypt(p)
+        with self._event_lock:
+            if self._event_dispatcher is None:
+                self._event_dispatcher = EventDispatcher(
+                    self.EVENT_QUEUE_SIZE, self.EVENT_QUEUE_TIMEOUT
+                )
+            self._event_dispatcher.subscribe(event, handler)
 
-            self._desktop_connection.send(p)
-        except RuntimeError as e:
-            logger.debug("Failed to send a payload to the server: {0}".format(str(e)))
-            pass
+        # The reader thread receives the events.
+        self._get_multiplexer()
 
-    def _recv(self):
+    def unsubscribe(self, event, handler):
         """
-        Receive a payload from the server.
+        Stop calling a handler for a server event.
 
-        The payload is decrypted using the WebSocket server secret, if available.
+        :param str event: Name of the event.
+        :param callable handler: Handler given to :meth:`subscribe`.
+        """
+        dispatcher = self._event_dispatcher
+        if dispatcher is not None:
+            dispatcher.unsubscribe(event, handler)
 
-        :returns: Message from the server as a string.
-        :rtype: str
+    def call_server_methods(self, commands, timeout=None):
         """
-        try:
-            r = self._desktop_connection.recv()
-            r = r if isinstance(r, bytes) else r.encode("utf-8")
+        Call many WebSocket server methods at once.
 
-            # self._secret is expected to be none at the beginning of the connection handshake.
-            if self._secret:
-                r = self._secret.decrypt(r)
+        The requests are sent without waiting for the previous replies, so the round trips
+        overlap instead of adding up. In multiplexed mode the replies are routed by message
+        id. Otherwise at most ``BATCH_WINDOW_SIZE`` requests, or ``BATCH_WINDOW_BYTES``
+        bytes of requests, are sent before the replies due are read and matched by id.
 
-            return r
-        except RuntimeError as e:
-            logger.debug("Failed receive a payload from the server: {0}".format(str(e)))
-            return "{}"
+        The user information is looked up once for the whole batch.
 
-    def _send_and_recv(self, payload):
-        """Helper method that:
-            - Send a payload to the server.
-            - Receive a payload from the server.
+        :param list commands: List of ``(name, data)`` tuples, where ``data`` are the
+            arguments of the server method or ``None``.
+        :param float timeout: Amount of seconds to wait for the whole batch. If not set,
+            the ``call_timeout`` of the client is used. The calls without a reply by then
+            fail with a timeout error.
 
-        :param str payload: Payload to send to the server.
+        :returns: A dictionary with the ``results`` of the calls, in the order of the
+            commands, and the total ``elapsed`` time in seconds. Each result is a dictionary
+            with the ``name`` of the server method, its ``reply``, an ``error`` message if
+            the call failed and the ``elapsed`` time of the call in seconds.
+        :rtype: dict
+        """
+        start = time.perf_counter()
+        timeout = self._call_timeout if timeout is None else timeout
+        deadline = self._get_deadline(timeout)
+
+        user = self._get_user_context()
+        results = [
+            {"name": name, "reply": None, "error": None, "elapsed": None}
+            for name, _ in commands
+        ]
+
+        if self._multiplexed:
+            self._call_multiplexed_batch(commands, results, user, deadline)
+        else:
+            self._call_pipelined_batch(commands, results, user, deadline)
 
-        :returns: Message from the server as a string.
-        :rtype: str
+        return {"results": results, "elapsed": time.perf_counter() - start}
+
+    def _build_batch_messages(self, commands, results, user):
         """
-        self._send(payload)
+        Build the messages of a batch. The connection must be built, the messages carry
+        the protocol version negotiated by the handshake.
 
-        return self._recv()
+        Unsupported commands and invalid arguments fail on their own, without a message.
 
-    def _call_server_method(self, name, data=None):
+        :param list commands: List of ``(name, data)`` tuples.
+        :param list results: Result dictionaries to fill, in the order of the commands.
+        :param dict user: User information to send with the commands.
+
+        :returns: The list of ``(message id, payload)`` tuples and the list of the result
+            dictionaries of these messages.
+        :rtype: tuple
         """
-        Make a call to a WebSocket server method and return the raw server response as a string.
+        messages = []
+        sent_results = []
+        for (name, data), result in zip(commands, results):
+            try:
+                messages.append(self._build_message(name, data, user=user))
+            except (RuntimeError, TypeError) as e:
+                result["error"] = str(e)
+                continue
+            sent_results.append(result)
+        return messages, sent_results
+
+    def _call_multiplexed_batch(self, commands, results, user, deadline=None):
+        """
+        Send a batch of commands through the multiplexer and wait for all the replies.
 
-        :param str name: Name of the server method
-        :param dict data: Arguments of the server method (default: {None})
+        :param list commands: List of ``(name, data)`` tuples.
+        :param list results: Result dictionaries to fill, in the order of the commands.
+        :param dict user: User information to send with the commands.
+        :param float deadline: Time, from :func:`time.monotonic`, by which the replies
+            must be received. If not set, wait forever.
+        """
+        try:
+            self._get_multiplexer()
+        except Exception as e:
+            for result in results:
+                result["error"] = str(e)
+            return
+
+        messages, results = self._build_batch_messages(commands, results, user)
+        futures = {}
+        for index, (message_id, payload) in enumerate(messages):
+            sent_at = time.perf_counter()
+            try:
+                futures[self._submit(message_id, payload)] = (index, sent_at)
+            except Exception as e:
+                results[index]["error"] = str(e)
+
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        try:
+            for future in concurrent.futures.as_completed(futures, remaining):
+                index, sent_at = futures.pop(future)
+                results[index]["elapsed"] = time.perf_counter() - sent_at
+                try:
+                    results[index]["reply"] = future.result()
+                except Exception as e:
+                    results[index]["error"] = str(e)
+        except concurrent.futures.TimeoutError:
+            # The late replies are dropped by the multiplexer.
+            for future, (index, _) in futures.items():
+                future.cancel()
+                results[index]["error"] = "No reply within the batch timeout."
+            if self.metrics is not None:
+                self.metrics.increment("timeouts", len(futures))
+
+    def _call_pipelined_batch(self, commands, results, user, deadline=None):
+        """
+        Send a batch of commands on the connection, reading the replies as the window of
+        requests in flight fills up.
+
+        :param list commands: List of ``(name, data)`` tuples.
+        :param list results: Result dictionaries to fill, in the order of the commands.
+        :param dict user: User information to send with the commands.
+        :param float deadline: Time, from :func:`time.monotonic`, by which the replies
+            must be received. If not set, wait forever.
+        """
+        with self._lock:
+            self._cancel_requested = False
+            try:
+                self._get_connection(deadline, check_idle=True)
+            except Exception as e:
+                for result in results:
+                    result["error"] = str(e)
+                return
+            messages, results = self._build_batch_messages(commands, results, user)
+            self._call_pipelined_batch_locked(messages, results, deadline)
+
+    def _call_pipelined_batch_locked(self, messages, results, deadline):
+        # Requests waiting for their reply, by message id, with the index of their result,
+        # the time they were sent and their size.
+        in_flight = {}
+
+        for index, (message_id, payload) in enumerate(messages):
+            while in_flight and (
+                len(in_flight) >= self.BATCH_WINDOW_SIZE
+                or sum(size for _, _, size in in_flight.values()) + len(payload)
+                > self.BATCH_WINDOW_BYTES
+            ):
+                self._read_batch_reply(in_flight, results, deadline)
+
+            connection = self._connection
+            try:
+                sent_at = time.perf_counter()
+                self._send(payload, deadline)
+            except Exception as e:
+                results[index]["error"] = str(e)
+                if in_flight and self._connection is not connection:
+                    # The replies of the requests in flight are lost with the connection.
+                    self._fail_batch_replies(in_flight, results, str(e))
+                continue
+
+            if in_flight and self._connection is not connection:
+                # The connection was rebuilt while sending, the previous replies are lost.
+                self._fail_batch_replies(
+                    in_flight, results, "Lost the connection to the server."
+                )
 
-        :returns: Reply from the server as a python object (reply json is part).
-        :rtype: dict
+            in_flight[message_id] = (index, sent_at, len(payload))
+
+        while in_flight:
+            self._read_batch_reply(in_flight, results, deadline)
+
+    def _read_batch_reply(self, in_flight, results, deadline=None):
         """
-        command = {}
+        Read the reply of a request of a lock-step batch.
 
-        if not data:
-            data = {}
+        If the reply can't be read, all the requests in flight fail.
 
-        command["name"] = name
-        command["data"] = data
+        :param dict in_flight: Requests waiting for their reply, by message id.
+        :param list results: Result dictionaries to fill.
+        :param float deadline: Time, from :func:`time.monotonic`, by which the reply must
+            be received. If not set, wait forever.
+        """
+        try:
+            message = self._serializer.loads(self._recv(deadline))
+        except Exception as e:
+            logger.debug("Failed to read a batch reply: {0}".format(str(e)))
+            self._fail_batch_replies(
+                in_flight,
+                results,
+                "No reply received from the server: {0}".format(str(e) or repr(e)),
+            )
+            return
 
-        user_info = self._shotgun_connection.find_one(
-            "HumanUser",
-            [["login", "is", self._current_user.login]],
-            ["entity_hash", "groups", "permission_rule_set", "name"],
-        )
-        command_user = {}
-        command_user["entity"] = {}
-        command_user["entity"]["id"] = user_info["id"]
-        command_user["entity"]["type"] = user_info["type"]
-        command_user["entity"]["name"] = user_info["name"]
-        command_user["entity"]["status"] = "act"
-        command_user["entity"]["valid"] = "valid"
-        command_user["group_ids"] = [group["id"] for group in user_info["groups"]]
+        message_id = message.get("id")
+        if message_id is None:
+            # Nothing could be read from the server.
+            self._fail_batch_replies(
+                in_flight, results, "No reply received from the server."
+            )
+            return
 
-        command_user["rule_set_display_name"] = user_info["permission_rule_set"]["name"]
-        command_user["rule_set_id"] = user_info["permission_rule_set"]["id"]
+        request = in_flight.pop(message_id, None)
+        if request is None:
+            logger.debug("Dropping a reply with id {0}".format(message_id))
+            return
 
-        command["data"]["user"] = command_user
+        index, sent_at, _ = request
+        results[index]["elapsed"] = time.perf_counter() - sent_at
+        results[index]["reply"] = message.get("reply", "")
 
-        message = {}
-        message["protocol_version"] = self._protocol_version
-        message["id"] = CreateClient._get_next_message_id()
-        message["command"] = command
-        message["timestamp"] = int(time.time() * 1000)
+    @staticmethod
+    def _fail_batch_replies(in_flight, results, error):
+        """
+        Fail all the requests of a lock-step batch waiting for their reply.
 
-        return self._send_and_recv(json.dumps(message))
+        :param dict in_flight: Requests waiting for their reply, by message id.
+        :param list results: Result dictionaries to fill.
+        :param str error: Error message of the requests.
+        """
+        for index, _, _ in in_flight.values():
+            results[index]["error"] = error
+        in_flight.clear()
 
-    def _do_websocketserver_handshake(self):
+    def _submit(self, message_id, payload):
         """
-        Execute the websocket server handshake on the currently active websocket connection.
+        Send a message through the multiplexer.
 
-        The handshake is:
-            - Get the protocol version from the server
-            - Get the WebSocket server ID
-            - Get the WebSocket server secret from Shotgun (used to encrypt the communications)
+        :param int message_id: Id of the message.
+        :param str payload: Message to send to the server.
 
-        This function validates the handshake by doing a dummy call to the server at the end
-        of the handshake.
+        :returns: Future resolved with the reply from the server.
+        :rtype: concurrent.futures.Future
         """
-        self._secret = None
+        # A lost connection is rebuilt and the request sent again.
+        for attempt in range(2):
+            multiplexer = self._get_multiplexer()
+            if attempt:
+                # The new server may speak another protocol version.
+                payload = self._update_protocol_version(payload)
+            try:
+                return multiplexer.submit(message_id, payload)
+            except CONNECTION_ERRORS as e:
+                logger.debug("Lost the connection to the server: {0}".format(str(e)))
+                if attempt == 1:
+                    raise
 
-        # Grab the protocol version from the running Shotgun WebSocket server
-        protocol_version_resp = self._send_and_recv("get_protocol_version")
-        self._protocol_version = json.loads(protocol_version_resp)["protocol_version"]
+    @property
+    def _desktop_connection(self):
+        """
+        Return the currently active websocket connection to the Shotgun WebSocket server.
 
-        # Grab the WebSocket server ID from the Shotgun WebSocket server
-        server_id_resp = json.loads(self._call_server_method("get_ws_server_id"))
+        If there's no active connection, the function builds a new connection and do the
+        handshake so it's ready to use.
 
-        # dekstopserver and create return different structures for this. Allow a response from either server
-        if "reply" in server_id_resp:
-            server_id_resp = server_id_resp["reply"]
+        :returns: active websocket connection to the Shotgun WebSocket server.
+        :rtype: WebSocket
+        """
+        return self._get_connection()
 
-        self._server_id = server_id_resp["ws_server_id"]
+    def _get_connection(self, deadline=None, check_idle=False):
+        """
+        Return the active websocket connection, building it and doing the handshake if
+        needed, see :attr:`_desktop_connection`.
 
-        # Ask for the secret for this server id.
-        response = self._shotgun_connection._call_rpc(
-            "retrieve_ws_server_secret", {"ws_server_id": self._server_id}
-        )
-        ws_server_secret = response["ws_server_secret"]
-        ws_server_secret = (
-            ws_server_secret.encode("utf-8")
-            if isinstance(ws_server_secret, str)
-            else ws_server_secret
-        )
-        if ws_server_secret[-1:] != b"=":
-            ws_server_secret += b"="
+        :param float deadline: Time, from :func:`time.monotonic`, by which the connection
+            must be built. The connection and handshake timeouts are shortened to meet it.
+            If not set, only these timeouts apply.
+        :param bool check_idle: If ``True`` and the connection was idle for more than
+            ``IDLE_CHECK_INTERVAL``, it is rebuilt if the server closed it. No reply must
+            be expected on the connection.
 
-        self._secret = Fernet(ws_server_secret)
+        :returns: active websocket connection to the Shotgun WebSocket server.
+        :rtype: WebSocket
+        :raises CreateTimeoutError: If the server didn't answer in time.
+        """
+        # Otherwise a lost connection is detected when sending or receiving fails and is
+        # rebuilt on the next access.
+        if (
+            check_idle
+            and self._connection
+            and not self._in_handshake
+            and time.monotonic() - (self._last_activity or 0) > self.IDLE_CHECK_INTERVAL
+            and is_idle_connection_closed(self._connection)
+        ):
+            logger.debug("The server closed the idle connection, rebuilding it.")
+            self._drop_connection(graceful=False)
+            if self.metrics is not None:
+                self.metrics.increment("reconnects")
 
-        # Make a dummy call to the server to make sure that the handshake is correctly done
-        supported_command_repsp = self._call_server_method("list_supported_commands")
-        supported_commands = json.loads(supported_command_repsp).get("reply", [])
+        try:
+            if not self._connection:
+                self._restore_pooled_session()
 
-        if "list_supported_commands" not in supported_commands:
-            raise RuntimeError("Unknown error in the websocket server handshake")
+            if not self._connection:
+                self._connection = self._open_connection(deadline)
+                self._do_websocketserver_handshake(deadline)
+
+        except TIMEOUT_ERRORS as e:
+            logger.debug("Timed out building the websocket connection: {0}".format(e))
+            self._drop_connection(graceful=False)
+            raise CreateTimeoutError(
+                "The WebSocket server didn't answer in time: {0}".format(e)
+            )
+        except Exception as e:
+            logger.debug(
+                "Failed to get a valid websocket connection: {0}".format(str(e))
+            )
+            self._connection = None
+            raise
+
+        return self._connection
+
+    def _restore_pooled_session(self):
+        """
+        Borrow a handshaken connection from the connection pool, if the client uses it.
+
+        :returns: ``True`` if a connection was borrowed, ``False`` otherwise.
+        :rtype: bool
+        """
+        if not self._use_pool:
+            return False
+
+        session = get_connection_pool().acquire(self._connection_key)
+        if session is None:
+            return False
+
+        self._connection = session.connection
+        self._server_id = session.server_id
+        self._secret = session.secret
+        self._protocol_version = session.protocol_version
+        self._supported_commands = session.supported_commands
+        self._last_activity = session.last_used
+        return True
+
+    def _open_connection(self, deadline=None):
+        """
+        Open a new websocket connection to the Shotgun WebSocket server.
+
+        The handshake is not done on the new connection.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the connection
+            must be open. If not set, ``connect_timeout`` applies.
+
+        :returns: The new connection.
+        :rtype: WebSocket
+        """
+        start = time.perf_counter()
+
+        timeout = self._get_timeout(self._connect_timeout, deadline)
+        try:
+            connection = self._create_websocket(
+                self.shotgun_create_websocket_port, timeout
+            )
+        except (websocket.WebSocketException, OSError):
+            # The server may have moved to another port since the port was cached.
+            if not self._port_from_cache or not self._refresh_websocket_port():
+                raise
+
+            logger.debug(
+                "The cached WebSocket server port is outdated, using port {0}".format(
+                    self.shotgun_create_websocket_port
+                )
+            )
+            connection = self._create_websocket(
+                self.shotgun_create_websocket_port,
+                self._get_timeout(self._connect_timeout, deadline),
+            )
+
+        if self.metrics is not None:
+            self.metrics.record("connect", time.perf_counter() - start)
+
+        self._last_activity = time.monotonic()
+        return connection
+
+    def _create_websocket(self, port, timeout):
+        """
+        Connect to the Shotgun WebSocket server.
+
+        :param int port: Port of the WebSocket server.
+        :param float timeout: Amount of seconds to wait for the connection.
+
+        :returns: The new connection.
+        :rtype: WebSocket
+        """
+        return websocket.create_connection(
+            self.SG_CREATE_WEBSOCKET_URL.format(port),
+            timeout=timeout,
+            sslopt={"ca_certs": ssl.get_default_verify_paths().cafile},
+            # The payloads are base64 Fernet tokens, or JSON parsed right away.
+            # Validating them in pure Python takes longer than decrypting them.
+            skip_utf8_validation=True,
+        )
+
+    def _is_server_listening(self, timeout=1.0):
+        """
+        Check if the Shotgun WebSocket server accepts connections, without building a
+        websocket connection nor doing the handshake.
+
+        :param float timeout: Amount of seconds to wait for the server to accept the
+            connection.
+
+        :returns: ``True`` if the server port accepts connections, ``False`` otherwise.
+        :rtype: bool
+        """
+        url = urlparse(
+            self.SG_CREATE_WEBSOCKET_URL.format(self.shotgun_create_websocket_port)
+        )
+        try:
+            sock = socket.create_connection((url.hostname, url.port), timeout=timeout)
+        except OSError:
+            return False
+
+        sock.close()
+        return True
+
+    def _get_websocket_port(self):
+        """
+        Get the WebSocket server port of the site, from the cache if possible.
+
+        :returns: The WebSocket server port.
+        :rtype: int
+        """
+        site = self._shotgun_connection.base_url
+
+        port = CreateClient._websocket_port_cache.get(site)
+        if port is None:
+            disk_cache = self._get_disk_cache(
+                "websocket_ports.json",
+                self.WEBSOCKET_PORT_TTL,
+                self.PERSIST_WEBSOCKET_PORT,
+            )
+            if disk_cache is not None:
+                port = disk_cache.get(site)
+                if port is not None:
+                    CreateClient._websocket_port_cache.set(site, port)
+
+        if port is None:
+            return self._read_websocket_port()
+
+        self._port_from_cache = True
+        return port
+
+    def _read_websocket_port(self):
+        """
+        Read the WebSocket server port from the Shotgun preferences and cache it.
+
+        :returns: The WebSocket server port.
+        :rtype: int
+        """
+        site = self._shotgun_connection.base_url
+
+        # Grab the WebSocket server port from Shotgun
+        prefs = self._shotgun_connection.preferences_read()
+        sg_create_prefs = json.loads(prefs.get(CreateClient.SG_CREATE_SETTINGS_KEY, {}))
+        port = sg_create_prefs.get(
+            CreateClient.SG_CREATE_WEBSOCKET_PORT_KEY,
+            CreateClient.SG_CREATE_DEFAULT_WEBSOCKET_PORT,
+        )
+
+        CreateClient._websocket_port_cache.set(site, port)
+        disk_cache = self._get_disk_cache(
+            "websocket_ports.json", self.WEBSOCKET_PORT_TTL, self.PERSIST_WEBSOCKET_PORT
+        )
+        if disk_cache is not None:
+            disk_cache.set(site, port)
+
+        self._port_from_cache = False
+        return port
+
+    def _refresh_websocket_port(self):
+        """
+        Read the WebSocket server port from Shotgun again, replacing the cached port.
+
+        :returns: ``True`` if the port changed, ``False`` otherwise.
+        :rtype: bool
+        """
+        port = self._read_websocket_port()
+        if port == self.shotgun_create_websocket_port:
+            return False
+
+        self.shotgun_create_websocket_port = port
+        return True
+
+    @staticmethod
+    def _get_disk_cache(name, ttl, enabled=True):
+        """
+        Get one of the on disk caches of the framework.
+
+        :param str name: File name of the cache.
+        :param float ttl: Default time to live of the cache entries, in seconds.
+        :param bool enabled: If ``False``, no cache is returned.
+
+        :returns: The cache, or ``None`` if it is not enabled.
+        :rtype: DiskCache
+        """
+        if not enabled:
+            return None
+
+        cache = CreateClient._disk_caches.get(name)
+        if cache is None:
+            cache = CreateClient._disk_caches[name] = DiskCache(
+                get_cache_path(name), ttl
+            )
+        return cache
+
+    def _dispatch_event(self, event, data):
+        """
+        Hand an event pushed by the server to its handlers.
+
+        :param str event: Name of the event.
+        :param data: Data of the event.
+        """
+        dispatcher = self._event_dispatcher
+        if dispatcher is None:
+            logger.debug("Dropping event {0}, nothing is subscribed.".format(event))
+            return
+
+        if not dispatcher.put(event, data) and self.metrics is not None:
+            self.metrics.increment("events_dropped")
+
+    def _get_multiplexer(self):
+        """
+        Get the multiplexer routing the replies of the active connection.
+
+        If the connection was lost, a new connection is built, the handshake is done and a
+        new multiplexer is started.
+
+        :returns: A running multiplexer.
+        :rtype: Multiplexer
+        """
+        with self._multiplexer_lock:
+            multiplexer = self._multiplexer
+            if multiplexer is not None and multiplexer.is_running:
+                return multiplexer
+
+            if multiplexer is not None and multiplexer.connection is self._connection:
+                logger.debug("Lost the multiplexed connection, rebuilding it.")
+                self._drop_connection()
+
+            # The handshake must be done before the reader thread owns the connection.
+            self._multiplexer = Multiplexer(self, self._desktop_connection)
+            return self._multiplexer
+
+    @property
+    def _connection_key(self):
+        """
+        Key identifying the connections that can be shared with this client.
+
+        :returns: Site, user login and port of the connection.
+        :rtype: tuple
+        """
+        return (
+            self._shotgun_connection.base_url,
+            self._current_user.login,
+            self.shotgun_create_websocket_port,
+        )
+
+    @property
+    def _current_user(self):
+        """
+        Get the currently authenticated user.
+
+        :returns: Currently authenticated user.
+        :rtype: ShotgunUser
+        """
+        return sgtk.get_authenticated_user()
+
+    def refresh_user_context(self):
+        """
+        Discard the cached user information and fetch it again from Shotgun.
+
+        Use this when the permissions or the groups of the current user changed
+        since the cache was filled.
+
+        :returns: The user information sent along with the commands.
+        :rtype: dict
+        """
+        return self._get_user_context(refresh=True)
+
+    def _get_user_context(self, refresh=False):
+        """
+        Get the user information sent along with every command.
+
+        The information is cached per site and user login for ``user_context_ttl`` seconds.
+        The cache entry is discarded when the authenticated user changes.
+
+        :param bool refresh: If ``True``, the cached value is ignored and replaced.
+
+        :returns: The user block of the command.
+        :rtype: dict
+        """
+        current_user = self._current_user
+        cache_key = (self._shotgun_connection.base_url, current_user.login)
+
+        if current_user is not self._user_context_owner:
+            # The authenticated user changed since the last call, we can't trust the
+            # cached permissions anymore.
+            if self._user_context_owner is not None:
+                refresh = True
+            self._user_context_owner = current_user
+
+        if not refresh and self._user_context_ttl > 0:
+            command_user = CreateClient._user_context_cache.get(cache_key)
+            if command_user is not None:
+                return command_user
+
+        start = time.perf_counter()
+        user_info = self._shotgun_connection.find_one(
+            "HumanUser",
+            [["login", "is", current_user.login]],
+            ["entity_hash", "groups", "permission_rule_set", "name"],
+        )
+        if self.metrics is not None:
+            self.metrics.record("user_lookup", time.perf_counter() - start)
+        command_user = {}
+        command_user["entity"] = {}
+        command_user["entity"]["id"] = user_info["id"]
+        command_user["entity"]["type"] = user_info["type"]
+        command_user["entity"]["name"] = user_info["name"]
+        command_user["entity"]["status"] = "act"
+        command_user["entity"]["valid"] = "valid"
+        command_user["group_ids"] = [group["id"] for group in user_info["groups"]]
+
+        command_user["rule_set_display_name"] = user_info["permission_rule_set"]["name"]
+        command_user["rule_set_id"] = user_info["permission_rule_set"]["id"]
+
+        if self._user_context_ttl > 0:
+            CreateClient._user_context_cache.set(
+                cache_key, command_user, ttl=self._user_context_ttl
+            )
+        else:
+            CreateClient._user_context_cache.invalidate(cache_key)
+
+        return command_user
+
+    def _send(self, payload, deadline=None):
+        """
+        Send a payload to the server.
+
+        The payload is encrypted using the WebSocket server secret, if available.
+
+        :param str payload: Payload to send to the server.
+        :param float deadline: Time, from :func:`time.monotonic`, by which the payload
+            must be sent. If not set, wait forever.
+        """
+        # A lost connection is rebuilt and the payload sent again, unless the handshake is
+        # in progress since it can't be resumed on a new connection.
+        attempts = 1 if self._in_handshake else 2
+
+        for attempt in range(attempts):
+            try:
+                connection = self._get_connection(deadline)
+                if attempt:
+                    # The new server may speak another protocol version.
+                    payload = self._update_protocol_version(payload)
+
+                # The payload is encrypted after the connection is built since a new
+                # handshake changes the secret.
+                data = self._encrypt(payload)
+
+                self._set_connection_deadline(connection, deadline)
+                start = time.perf_counter()
+                self._send_frame(connection, data)
+                self._last_activity = time.monotonic()
+
+                if self.metrics is not None:
+                    self.metrics.record("send", time.perf_counter() - start)
+                    self.metrics.increment("bytes_sent", len(data))
+                return
+            except TIMEOUT_ERRORS as e:
+                self._on_timeout(e)
+            except CONNECTION_ERRORS as e:
+                logger.debug("Lost the connection to the server: {0}".format(str(e)))
+                self._drop_connection()
+                if self._cancel_requested:
+                    self._cancel_requested = False
+                    raise concurrent.futures.CancelledError()
+                if self.metrics is not None:
+                    self.metrics.increment("reconnects")
+                if attempt == attempts - 1:
+                    raise
+            except (CreateTimeoutError, concurrent.futures.CancelledError):
+                # Building the connection timed out or was cancelled, the call must fail.
+                raise
+            except RuntimeError as e:
+                logger.debug(
+                    "Failed to send a payload to the server: {0}".format(str(e))
+                )
+                if self.metrics is not None:
+                    self.metrics.increment("errors")
+                return
+
+    def _recv(self, deadline=None):
+        """
+        Receive a payload from the server.
+
+        The payload is decrypted using the WebSocket server secret, if available.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the payload
+            must be received. If not set, wait forever.
+
+        :returns: Message from the server as a string.
+        :rtype: str
+        """
+        try:
+            connection = self._get_connection(deadline)
+
+            self._set_connection_deadline(connection, deadline)
+            start = time.perf_counter()
+            # The raw frame data, decoding a text frame to str would only be undone.
+            opcode, r = connection.recv_data()
+            if opcode not in (
+                websocket.ABNF.OPCODE_TEXT,
+                websocket.ABNF.OPCODE_BINARY,
+            ):
+                r = b""
+            self._last_activity = time.monotonic()
+
+            if self.metrics is not None:
+                self.metrics.record("wait", time.perf_counter() - start)
+                self.metrics.increment("bytes_received", len(r))
+
+            return self._decrypt(r)
+        except TIMEOUT_ERRORS as e:
+            self._on_timeout(e)
+        except CONNECTION_ERRORS as e:
+            # The reply is lost, the next call will rebuild the connection.
+            logger.debug("Lost the connection to the server: {0}".format(str(e)))
+            self._drop_connection()
+            if self.metrics is not None:
+                self.metrics.increment("errors")
+            if self._cancel_requested:
+                self._cancel_requested = False
+                raise concurrent.futures.CancelledError()
+            raise
+        except (CreateTimeoutError, concurrent.futures.CancelledError):
+            # Building the connection timed out or was cancelled, the call must fail.
+            raise
+        except RuntimeError as e:
+            logger.debug("Failed receive a payload from the server: {0}".format(str(e)))
+            if self.metrics is not None:
+                self.metrics.increment("errors")
+            return "{}"
+
+    def _set_connection_deadline(self, connection, deadline):
+        """
+        Make the blocking operations on the connection time out at a deadline.
+
+        The handshake keeps the timeout it set for all its steps.
+
+        :param WebSocket connection: The connection.
+        :param float deadline: Time, from :func:`time.monotonic`, by which the next
+            operation must be done. If not set, the operations wait forever.
+        """
+        if not self._in_handshake:
+            connection.settimeout(self._get_timeout(None, deadline))
+
+    @staticmethod
+    def _get_deadline(timeout):
+        """
+        :param float timeout: Amount of seconds, or ``None`` to wait forever.
+
+        :returns: The time, from :func:`time.monotonic`, at which the timeout expires, or
+            ``None``.
+        :rtype: float
+        """
+        return None if timeout is None else time.monotonic() + timeout
+
+    @staticmethod
+    def _get_timeout(timeout, deadline):
+        """
+        Shorten a timeout so it expires by a deadline.
+
+        :param float timeout: Amount of seconds, or ``None`` to wait forever.
+        :param float deadline: Time, from :func:`time.monotonic`, or ``None``.
+
+        :returns: The amount of seconds to wait, or ``None`` to wait forever.
+        :rtype: float
+        :raises websocket.WebSocketTimeoutException: If the deadline has passed.
+        """
+        if deadline is None:
+            return timeout
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise websocket.WebSocketTimeoutException("The deadline has passed.")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _on_timeout(self, error):
+        """
+        Handle a connection operation that timed out.
+
+        The connection is closed: a frame may have been partially read, and the late
+        reply must not be read as the reply of the next call. The server is not answering,
+        so it is not asked to acknowledge the close.
+
+        :param Exception error: The timeout error.
+
+        :raises CreateTimeoutError: Always.
+        """
+        logger.debug("The WebSocket server didn't answer in time: {0}".format(error))
+        self._drop_connection(graceful=False)
+        if self.metrics is not None:
+            self.metrics.increment("timeouts")
+        raise CreateTimeoutError(
+            "The WebSocket server didn't answer in time: {0}".format(error)
+        )
+
+    def cancel_calls(self):
+        """
+        Cancel the calls waiting for a reply, from any thread.
+
+        In multiplexed mode, the futures of the calls are cancelled and the late replies
+        are dropped. In lock-step mode, the connection of the call in flight is closed
+        and the call raises a ``concurrent.futures.CancelledError``.
+        """
+        if self._multiplexed:
+            multiplexer = self._multiplexer
+            if multiplexer is not None:
+                multiplexer.cancel_pending()
+            return
+
+        if self._lock.acquire(blocking=False):
+            # No call in flight.
+            self._lock.release()
+            return
+
+        connection = self._connection
+        if connection is None or connection.sock is None:
+            return
+
+        self._cancel_requested = True
+        try:
+            # Wakes up the thread blocked on the connection.
+            connection.sock.shutdown(socket.SHUT_RDWR)
+        except OSError as e:
+            logger.debug("Failed to interrupt the connection: {0}".format(str(e)))
+
+    def _encrypt(self, payload):
+        """
+        Encrypt a payload using the WebSocket server secret, if available.
+
+        :param payload: Payload to encrypt.
+        :type payload: str or bytes
+
+        :returns: The encrypted payload.
+        :rtype: bytes
+        """
+        p = payload if isinstance(payload, bytes) else payload.encode("utf-8")
+
+        # self._secret is expected to be none at the beginning of the connection handshake.
+        if self._secret:
+            # Compressing before encrypting also shrinks the base64 encoding of Fernet.
+            if len(p) >= self.COMPRESSION_THRESHOLD and self._use_compression:
+                with self._timer("compress"):
+                    p = zlib.compress(p, self.COMPRESSION_LEVEL)
+
+            with self._timer("encrypt"):
+                p = self._secret.encrypt(p)
+
+        return p
+
+    def _decrypt(self, data):
+        """
+        Decrypt a payload using the WebSocket server secret, if available.
+
+        :param data: Payload received from the server.
+        :type data: str or bytes
+
+        :returns: The decrypted payload.
+        :rtype: bytes
+        """
+        r = data if isinstance(data, bytes) else data.encode("utf-8")
+
+        # self._secret is expected to be none at the beginning of the connection handshake.
+        if self._secret:
+            with self._timer("decrypt"):
+                r = self._secret.decrypt(r)
+
+            # A JSON message starts with "{", a zlib stream with 0x78.
+            if r[:1] == ZLIB_HEADER:
+                with self._timer("decompress"):
+                    r = zlib.decompress(r)
+
+        return r
+
+    def _timer(self, phase, **attributes):
+        """
+        Context manager recording the duration of its block, if the client collects
+        metrics, see :meth:`Metrics.timer`.
+
+        :param str phase: Name of the phase.
+        """
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.timer(phase, **attributes)
+
+    def _send_frame(self, connection, data):
+        """
+        Send a payload in a single frame, see :func:`send_frame`.
+
+        The frame is binary if the server supports it.
+
+        :param WebSocket connection: The connection.
+        :param bytes data: The payload.
+        """
+        if self.BINARY_FRAMES_CAPABILITY in (self._supported_commands or ()):
+            send_frame(connection, data, websocket.ABNF.OPCODE_BINARY)
+        else:
+            send_frame(connection, data)
+
+    @property
+    def _use_compression(self):
+        """
+        ``True`` if the large messages are compressed.
+        """
+        return self._compression and self.COMPRESSION_CAPABILITY in (
+            self._supported_commands or ()
+        )
+
+    def _drop_connection(self, graceful=True):
+        """
+        Close the active connection and forget it, so the next access builds a new one.
+
+        :param bool graceful: If ``True``, the server is asked to close the connection and
+            its answer is awaited for a few seconds. Otherwise the socket is closed right
+            away.
+        """
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+
+        try:
+            if graceful:
+                connection.close()
+            else:
+                connection.shutdown()
+        except Exception as e:
+            logger.debug("Failed to close the connection: {0}".format(str(e)))
+
+    def _send_and_recv(self, payload, timeout=None):
+        """Helper method that:
+            - Send a payload to the server.
+            - Receive a payload from the server.
+
+        :param str payload: Payload to send to the server.
+        :param float timeout: Amount of seconds to wait for the reply. If not set, wait
+            forever.
+
+        :returns: Message from the server as a string.
+        :rtype: str
+        """
+        deadline = self._get_deadline(timeout)
+        self._send(payload, deadline)
+
+        return self._recv(deadline)
+
+    def _call_server_method(self, name, data=None, timeout=None):
+        """
+        Make a call to a WebSocket server method and return the raw server response as a string.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+        :param float timeout: Amount of seconds to wait for the reply. If not set, wait
+            forever.
+
+        :returns: Reply from the server as a python object (reply json is part).
+        :rtype: dict
+        """
+        user = self._get_user_context()
+
+        # Another thread must not read our reply.
+        with self._lock:
+            self._cancel_requested = False
+            deadline = self._get_deadline(timeout)
+            # The message carries the protocol version negotiated by the handshake. The
+            # request can't be sent again once sent, it may not be idempotent.
+            self._get_connection(deadline, check_idle=True)
+            _, payload = self._build_message(name, data, user=user)
+            self._send(payload, deadline)
+            return self._recv(deadline)
+
+    def _build_message(self, name, data=None, user=None, options=None):
+        """
+        Build the message used to call a WebSocket server method.
+
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method (default: {None})
+        :param dict user: User information to send with the command. If not set, the
+            information of the current user is used.
+        :param dict options: Additional fields of the message.
+
+        :returns: The id of the message and the message serialized as UTF-8 encoded JSON.
+        :rtype: tuple
+        :raises RuntimeError: If the command is not supported by the server and the
+            commands are validated.
+        """
+        self._check_supported(name)
+        user = user or self._get_user_context()
+        message_id = CreateClient._get_next_message_id()
+
+        if self.metrics is not None:
+            self.metrics.increment("calls")
+
+        with self._timer("encode", name=name):
+            return message_id, self._serialize_message(
+                message_id, name, data, user, options
+            )
+
+    def _check_supported(self, name):
+        """
+        Make sure the server supports a command when the commands are validated.
+
+        :param str name: Name of the server method
+
+        :raises RuntimeError: If the command is not supported by the server.
+        """
+        if not self._validate_commands or self._in_handshake:
+            return
+
+        if name not in self.supported_commands:
+            raise RuntimeError(
+                "The WebSocket server doesn't support the {0} command.".format(name)
+            )
+
+    def _serialize_message(self, message_id, name, data, user, options=None):
+        """
+        Serialize a message.
+
+        Only the arguments of the command are serialized on every call. The user block
+        is serialized once and the rest of the message is formatted around them.
+
+        :param int message_id: Id of the message.
+        :param str name: Name of the server method
+        :param dict data: Arguments of the server method, or ``None``.
+        :param dict user: User information to send with the command.
+        :param dict options: Additional fields of the message.
+
+        :returns: The message serialized as UTF-8 encoded JSON.
+        :rtype: bytes
+        :raises TypeError: If the arguments are not a dictionary or can't be serialized.
+        """
+        if data and not isinstance(data, dict):
+            # The user block is sent along with the arguments.
+            raise TypeError(
+                "The arguments of the {0} command must be a dictionary, not {1}.".format(
+                    name, type(data).__name__
+                )
+            )
+
+        dumps = self._serializer.dumps
+
+        extra_fields = b""
+        if self._use_compression:
+            # The server may compress its reply.
+            extra_fields = b',"compression":"zlib"'
+        for key, value in (options or {}).items():
+            extra_fields += b"," + dumps(key) + b":" + dumps(value)
+
+        if data and "user" in data:
+            # The user block we send replaces the one from the caller.
+            data = dict(data)
+            del data["user"]
+
+        data_json = dumps(data) if data else b"{}"
+        if data_json == b"{}":
+            data_json = b'{"user":' + self._serialize_user(user) + b"}"
+        else:
+            data_json = data_json[:-1] + b',"user":' + self._serialize_user(user) + b"}"
+
+        return MESSAGE_TEMPLATE % (
+            dumps(self._protocol_version),
+            message_id,
+            dumps(name),
+            data_json,
+            int(time.time() * 1000),
+            extra_fields,
+        )
+
+    def _update_protocol_version(self, payload):
+        """
+        Set the protocol version of the active connection in a message serialized for a
+        previous connection.
+
+        :param bytes payload: Message serialized by :meth:`_serialize_message`.
+
+        :returns: The message with the current protocol version.
+        :rtype: bytes
+        """
+        prefix = b'{"protocol_version":'
+        if not payload.startswith(prefix):
+            return payload
+
+        end = payload.index(b',"id":', len(prefix))
+        return prefix + self._serializer.dumps(self._protocol_version) + payload[end:]
+
+    def _serialize_user(self, user):
+        """
+        Serialize a user block, reusing the last result when the block didn't change.
+
+        :param dict user: User information to send with the command.
+
+        :returns: The user block serialized as UTF-8 encoded JSON.
+        :rtype: bytes
+        """
+        cached = self._user_context_json
+        if cached is not None and cached[0] is user:
+            return cached[1]
+
+        user_json = self._serializer.dumps(user)
+        self._user_context_json = (user, user_json)
+        return user_json
+
+    def _do_websocketserver_handshake(self, deadline=None):
+        """
+        Execute the websocket server handshake on the currently active websocket connection.
+
+        The handshake is:
+            - Get the protocol version from the server
+            - Get the WebSocket server ID
+            - Get the WebSocket server secret from Shotgun (used to encrypt the communications)
+
+        This function validates the handshake by doing a dummy call to the server at the end
+        of the handshake.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the handshake
+            must be done. If not set, ``handshake_timeout`` applies to each step.
+        """
+        steps = self._iter_websocketserver_handshake(deadline)
+        step = next(steps)
+        while step is not None:
+            try:
+                step()
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = next(steps, None)
+
+    def _iter_websocketserver_handshake(self, deadline=None):
+        """
+        Iterate over the blocking steps of the websocket server handshake, see
+        :meth:`_do_websocketserver_handshake`.
+
+        The caller runs every step in turn and throws the exception a step raised back into
+        the iterator, which decides to start over or to give up. This way the
+        :class:`AsyncCreateClient` can run the steps in an executor and still share the
+        retries and the metrics of this client.
+
+        The connection is closed if the handshake fails.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the handshake
+            must be done.
+
+        :returns: Iterator over functions taking no argument.
+        """
+        start = time.perf_counter()
+        try:
+            try:
+                yield from self._iter_handshake_attempt(deadline)
+            except Exception as e:
+                # Running out of time says nothing about the secret.
+                if not self._secret_from_cache or (
+                    deadline is not None and time.monotonic() >= deadline
+                ):
+                    raise
+
+                # The validation failed with the cached secret, timeouts included since a
+                # server may ignore the messages encrypted with another secret. The
+                # server secret changed, start over on a new connection with the secret
+                # from Shotgun.
+                logger.debug(
+                    "The handshake failed with the cached secret: {0}".format(str(e))
+                )
+                yield self._evict_cached_secret
+                yield functools.partial(self._reopen_connection, deadline)
+                yield from self._iter_handshake_attempt(deadline)
+        except Exception:
+            # The connection is half handshaken, it can't be used.
+            self._drop_connection(graceful=False)
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record("handshake", time.perf_counter() - start)
+
+    def _iter_handshake_attempt(self, deadline=None):
+        """
+        Iterate over the steps of a single handshake attempt on the active connection.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the handshake
+            must be done.
+
+        :returns: Iterator over functions taking no argument.
+        """
+        self._secret = None
+        self._secret_from_cache = False
+        self._supported_commands = None
+        self._in_handshake = True
+        try:
+            for step in self._handshake_steps:
+                self._connection.settimeout(
+                    self._get_timeout(self._handshake_timeout, deadline)
+                )
+                start = time.perf_counter()
+                try:
+                    yield step
+                finally:
+                    if self.metrics is not None:
+                        self.metrics.record(
+                            self._get_handshake_phase(step),
+                            time.perf_counter() - start,
+                        )
+        finally:
+            self._in_handshake = False
+
+        # The calls set their own timeout, and the reader thread of a multiplexed
+        # connection waits for the replies forever.
+        self._connection.settimeout(None)
+
+    def _reopen_connection(self, deadline=None):
+        """
+        Replace the active connection with a new one, without doing the handshake.
+
+        :param float deadline: Time, from :func:`time.monotonic`, by which the connection
+            must be open.
+        """
+        self._drop_connection()
+        self._connection = self._open_connection(deadline)
+
+    @staticmethod
+    def _get_handshake_phase(step):
+        """
+        Name of the metrics phase of a handshake step.
+
+        :param step: One of the methods returned by :attr:`_handshake_steps`.
+
+        :returns: The phase name, for example ``handshake.secret``.
+        :rtype: str
+        """
+        return "handshake." + step.__name__[len("_handshake_") :]
+
+    @property
+    def _handshake_steps(self):
+        """
+        The steps of the websocket server handshake described in
+        :meth:`_do_websocketserver_handshake`, in order.
+
+        :returns: List of methods to call.
+        :rtype: list
+        """
+        return [
+            self._handshake_protocol_version,
+            self._handshake_server_id,
+            self._handshake_secret,
+            self._handshake_validate,
+        ]
+
+    def _handshake_protocol_version(self):
+        """
+        Grab the protocol version from the running Shotgun WebSocket server.
+        """
+        protocol_version_resp = self._send_and_recv("get_protocol_version")
+        self._protocol_version = self._serializer.loads(protocol_version_resp)[
+            "protocol_version"
+        ]
+
+    def _handshake_server_id(self):
+        """
+        Grab the WebSocket server ID from the Shotgun WebSocket server.
+        """
+        server_id_resp = self._serializer.loads(
+            self._call_server_method("get_ws_server_id")
+        )
+
+        # dekstopserver and create return different structures for this. Allow a response from either server
+        if "reply" in server_id_resp:
+            server_id_resp = server_id_resp["reply"]
+
+        self._server_id = server_id_resp["ws_server_id"]
+
+    def _handshake_secret(self):
+        """
+        Ask Shotgun for the secret of the WebSocket server, unless it is cached.
+        """
+        ws_server_secret = self._get_cached_secret()
+        self._secret_from_cache = ws_server_secret is not None
+
+        if ws_server_secret is None:
+            response = self._shotgun_connection._call_rpc(
+                "retrieve_ws_server_secret", {"ws_server_id": self._server_id}
+            )
+            ws_server_secret = response["ws_server_secret"]
+            ws_server_secret = (
+                ws_server_secret.encode("utf-8")
+                if isinstance(ws_server_secret, str)
+                else ws_server_secret
+            )
+            if ws_server_secret[-1:] != b"=":
+                ws_server_secret += b"="
+
+            self._cache_secret(ws_server_secret)
+
+        self._secret = create_fernet(ws_server_secret, self._crypto_backend)
+
+    @property
+    def _secret_cache_key(self):
+        """
+        Key of the secret of the WebSocket server in the secret caches.
+
+        :returns: Site and WebSocket server ID.
+        :rtype: str
+        """
+        return "{0} {1}".format(self._shotgun_connection.base_url, self._server_id)
+
+    def _get_secret_disk_cache(self):
+        """
+        :returns: The on disk cache of the WebSocket server secrets, or ``None`` if the
+            secrets are not persisted.
+        :rtype: DiskCache
+        """
+        return self._get_disk_cache(
+            "websocket_server_secrets.json",
+            self.WEBSOCKET_SERVER_SECRET_TTL,
+            self.PERSIST_WEBSOCKET_SERVER_SECRET,
+        )
+
+    def _get_cached_secret(self):
+        """
+        Get the cached secret of the WebSocket server.
+
+        :returns: The secret, or ``None`` if it is not cached.
+        :rtype: bytes
+        """
+        key = self._secret_cache_key
+        secret = CreateClient._websocket_server_secret_cache.get(key)
+        if secret is None:
+            disk_cache = self._get_secret_disk_cache()
+            secret = disk_cache.get(key) if disk_cache is not None else None
+            if secret is None:
+                return None
+            CreateClient._websocket_server_secret_cache.set(key, secret)
+
+        return secret.encode("utf-8")
+
+    def _cache_secret(self, secret):
+        """
+        Cache the secret of the WebSocket server.
+
+        :param bytes secret: The secret.
+        """
+        key = self._secret_cache_key
+        secret = secret.decode("utf-8")
+        CreateClient._websocket_server_secret_cache.set(key, secret)
+        disk_cache = self._get_secret_disk_cache()
+        if disk_cache is not None:
+            disk_cache.set(key, secret)
+
+    def _evict_cached_secret(self):
+        """
+        Remove the secret of the WebSocket server from the caches.
+        """
+        key = self._secret_cache_key
+        CreateClient._websocket_server_secret_cache.invalidate(key)
+        disk_cache = self._get_secret_disk_cache()
+        if disk_cache is not None:
+            disk_cache.invalidate(key)
+
+    def _handshake_validate(self):
+        """
+        Make a dummy call to the server to make sure that the handshake is correctly done.
+        """
+        supported_command_repsp = self._call_server_method("list_supported_commands")
+        supported_commands = self._serializer.loads(supported_command_repsp).get(
+            "reply", []
+        )
+
+        if "list_supported_commands" not in supported_commands:
+            raise RuntimeError("Unknown error in the websocket server handshake")
+
+        # Indexed, the commands are looked up on every call when they are validated.
+        self._supported_commands = frozenset(supported_commands)
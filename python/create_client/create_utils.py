@@ -8,9 +8,14 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import json
 import os
 import platform
 import subprocess
+import tempfile
+import threading
+import time
+import uuid
 
 from sgtk.util import ShotgunPath
 
@@ -63,50 +68,200 @@ def get_shotgun_create_path():
     return os.environ.get(env_var_override_name, CREATE_DEFAULT_LOCATION.current_os)
 
 
+# Environment variable giving Shotgun Create the path of the file to write once its
+# WebSocket server accepts connections. This is a proposed protocol Shotgun Create
+# doesn't implement yet, only the mock server of the benchmarks writes the file.
+CREATE_READY_FILE_ENV_VAR = "SHOTGUN_CREATE_READY_FILE"
+
+# Process started by start_shotgun_create, shared by all the callers of the process.
+_create_process = None
+_create_process_lock = threading.Lock()
+
+
+class CreateProcess(object):
+    """
+    A Shotgun Create process started by :func:`start_shotgun_create`.
+
+    Shotgun Create is asked to write a ready file once its WebSocket server accepts
+    connections. The file holds a JSON object with the ``websocket_port`` of the server.
+
+    The ready file is a proposed protocol that needs support on the Shotgun Create side,
+    the current releases never write it. Until they do, only the exit of the process
+    is detected and the WebSocket server port is probed instead.
+    """
+
+    def __init__(self, popen, ready_file):
+        """
+        :param subprocess.Popen popen: The Shotgun Create process.
+        :param str ready_file: Path of the file Shotgun Create is asked to write once
+            ready.
+        """
+        self.popen = popen
+        self.ready_file = ready_file
+        self._ready = None
+
+    @property
+    def has_exited(self):
+        """
+        ``True`` if the process is not running anymore.
+        """
+        return self.popen.poll() is not None
+
+    @property
+    def returncode(self):
+        """
+        Exit code of the process, or ``None`` if it is still running.
+        """
+        return self.popen.poll()
+
+    def read_ready_file(self):
+        """
+        Read the ready file written by Shotgun Create, if it supports it.
+
+        :returns: The content of the ready file, or ``None`` if it is not written yet.
+        :rtype: dict
+        """
+        if self._ready is not None:
+            return self._ready
+
+        try:
+            with open(self.ready_file, "r") as f:
+                ready = json.load(f)
+        except (OSError, ValueError):
+            # Missing or still being written.
+            return None
+
+        if not isinstance(ready, dict):
+            return None
+
+        # Keep the content for the other callers and don't leave the file behind.
+        self._ready = ready
+        try:
+            os.remove(self.ready_file)
+        except OSError:
+            pass
+        return ready
+
+    def wait_until_ready(self, timeout=30.0, min_delay=0.05, max_delay=0.5):
+        """
+        Wait for Shotgun Create to write its ready file.
+
+        The current Shotgun Create releases don't write the file, this only returns
+        before the timeout if the process exits or supports the ready file.
+
+        :param float timeout: Amount of seconds to wait.
+        :param float min_delay: Amount of seconds to wait after the first check.
+        :param float max_delay: Maximum amount of seconds to wait between two checks.
+
+        :returns: The content of the ready file, or ``None`` if the process exited or
+            the file wasn't written before the timeout.
+        :rtype: dict
+        """
+        deadline = time.monotonic() + timeout
+        delay = min_delay
+        while True:
+            ready = self.read_ready_file()
+            if ready is not None:
+                return ready
+
+            remaining = deadline - time.monotonic()
+            if self.has_exited or remaining <= 0:
+                return None
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+
+def get_create_environment(sg_connection):
+    """
+    Build the environment of a Shotgun Create process started for a Shotgun session.
+
+    :param Shotgun sg_connection: Shotgun connection whose session is used by Create.
+
+    :returns: The environment variables.
+    :rtype: dict
+    """
+    create_env = os.environ.copy()
+
+    # Set the current credentials so create starts in the right environment
+    create_env["SHOTGUN_CREATE_AUTHENTICATION_SITE"] = sg_connection.base_url
+    create_env["SHOTGUN_CREATE_AUTHENTICATION_SESSION"] = (
+        sg_connection.get_session_token()
+    )
+
+    # Unset values that might cause Shotgun Create to not start
+    # correctly. Some, originally set by Shotgun Desktop, might
+    # affect the way Shotgun Create bootstrap it's engine.
+    for environment_variable in [
+        "SHOTGUN_PIPELINE_CONFIGURATION_ID",
+        "SHOTGUN_SITE",
+        "SHOTGUN_ENTITY_TYPE",
+        "SHOTGUN_ENTITY_ID",
+        "LD_LIBRARY_PATH",  # In Maya on Linux this which causes issues launching Create.
+    ]:
+        if environment_variable in create_env:
+            del create_env[environment_variable]
+
+    return create_env
+
+
+def start_shotgun_create(sg_connection=None):
+    """
+    Launch Shotgun Create and keep track of the process.
+
+    Only one Shotgun Create is started per process: while the process started by a
+    previous call is running, it is returned instead of starting a new one.
+
+    :param Shotgun sg_connection: Shotgun connection to use with this client. If not set, the connection
+    from the current bundle is used.
+
+    :returns: The Shotgun Create process, or ``None`` if it couldn't be started.
+    :rtype: CreateProcess
+    """
+    global _create_process
+
+    with _create_process_lock:
+        if _create_process is not None and not _create_process.has_exited:
+            return _create_process
+
+        try:
+            create_env = get_create_environment(sg_connection)
+
+            ready_file = os.path.join(
+                tempfile.gettempdir(),
+                "shotgun_create_ready_{0}_{1}.json".format(
+                    os.getpid(), uuid.uuid4().hex
+                ),
+            )
+            create_env[CREATE_READY_FILE_ENV_VAR] = ready_file
+
+            with open(os.devnull, "w") as devnull_f:
+                popen = subprocess.Popen(
+                    [get_shotgun_create_path()],
+                    stdout=devnull_f,
+                    stderr=devnull_f,
+                    env=create_env,
+                )
+        except Exception:
+            return None
+
+        _create_process = CreateProcess(popen, ready_file)
+        return _create_process
+
+
 def launch_shotgun_create(sg_connection=None):
     """
     Launch Shotgun Create and inject the current authentication informations into the Shotgun Create session.
 
+    See :func:`start_shotgun_create` to keep track of the process.
+
     :param Shotgun sg_connection: Shotgun connection to use with this client. If not set, the connection
     from the current bundle is used.
 
     :returns: The success of the Shotgun Create launch
     :rtype: bool
     """
-    try:
-        create_env = os.environ.copy()
-
-        # Set the current credentials so create starts in the right environment
-        create_env["SHOTGUN_CREATE_AUTHENTICATION_SITE"] = sg_connection.base_url
-        create_env["SHOTGUN_CREATE_AUTHENTICATION_SESSION"] = (
-            sg_connection.get_session_token()
-        )
-
-        # Unset values that might cause Shotgun Create to not start
-        # correctly. Some, originally set by Shotgun Desktop, might
-        # affect the way Shotgun Create bootstrap it's engine.
-        for environment_variable in [
-            "SHOTGUN_PIPELINE_CONFIGURATION_ID",
-            "SHOTGUN_SITE",
-            "SHOTGUN_ENTITY_TYPE",
-            "SHOTGUN_ENTITY_ID",
-            "LD_LIBRARY_PATH",  # In Maya on Linux this which causes issues launching Create.
-        ]:
-            if environment_variable in create_env:
-                del create_env[environment_variable]
-
-        with open(os.devnull, "w") as devnull_f:
-            subprocess.Popen(
-                [get_shotgun_create_path()],
-                stdout=devnull_f,
-                stderr=devnull_f,
-                env=create_env,
-            )
-
-            return True
-
-    except Exception:
-        return False
+    return start_shotgun_create(sg_connection) is not None
 
 
 def is_create_installed():
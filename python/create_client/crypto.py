@@ -0,0 +1,182 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import struct
+import time
+
+# Coming from the vendors folder
+import fernet
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+_MAX_CLOCK_SKEW = 60
+
+VENDORED_BACKEND = "vendored"
+CRYPTOGRAPHY_BACKEND = "cryptography"
+
+
+class CryptographyFernet(object):
+    """
+    Fernet implementation doing AES with the ``cryptography`` package, which is backed by
+    OpenSSL. The vendored implementation does AES in pure Python through ``pyaes``.
+
+    Tokens and error handling are the same as the vendored :class:`fernet.Fernet`, so both
+    implementations can be used interchangeably on either side of a connection.
+    """
+
+    def __init__(self, key):
+        """
+        :param bytes key: 32 url-safe base64-encoded bytes.
+        """
+        if not isinstance(key, bytes):
+            raise TypeError("key must be bytes.")
+
+        key = base64.urlsafe_b64decode(key)
+        if len(key) != 32:
+            raise ValueError("Fernet key must be 32 url-safe base64-encoded bytes.")
+
+        self._signing_key = key[:16]
+        self._encryption_key = key[16:]
+        self._backend = default_backend()
+
+    def encrypt(self, data):
+        """
+        Encrypt data.
+
+        :param bytes data: Data to encrypt.
+
+        :returns: The Fernet token.
+        :rtype: bytes
+        """
+        return self._encrypt_from_parts(data, int(time.time()), os.urandom(16))
+
+    def _encrypt_from_parts(self, data, current_time, iv):
+        # The token is assembled once from its parts, the payload isn't copied to be
+        # padded or concatenated.
+        pad_length = 16 - len(data) % 16
+        encryptor = Cipher(
+            algorithms.AES(self._encryption_key), modes.CBC(iv), self._backend
+        ).encryptor()
+        parts = [
+            b"\x80",
+            struct.pack(">Q", current_time),
+            iv,
+            encryptor.update(data),
+            encryptor.update(bytes((pad_length,)) * pad_length),
+            encryptor.finalize(),
+        ]
+
+        hmactext = hmac.new(self._signing_key, digestmod=hashlib.sha256)
+        for part in parts:
+            hmactext.update(part)
+        parts.append(hmactext.digest())
+
+        return base64.urlsafe_b64encode(b"".join(parts))
+
+    def decrypt(self, token, ttl=None):
+        """
+        Decrypt a token.
+
+        :param bytes token: The Fernet token.
+        :param int ttl: Maximum age of the token, in seconds.
+
+        :returns: The decrypted data.
+        :rtype: bytes
+        :raises fernet.InvalidToken: If the token can't be decrypted.
+        """
+        if not isinstance(token, bytes):
+            raise TypeError("token must be bytes.")
+
+        current_time = int(time.time())
+
+        try:
+            data = base64.urlsafe_b64decode(token)
+        except (TypeError, binascii.Error):
+            raise fernet.InvalidToken
+
+        if not data or data[0:1] != b"\x80":
+            raise fernet.InvalidToken
+
+        try:
+            (timestamp,) = struct.unpack(">Q", data[1:9])
+        except struct.error:
+            raise fernet.InvalidToken
+        if ttl is not None:
+            if timestamp + ttl < current_time:
+                raise fernet.InvalidToken
+
+            if current_time + _MAX_CLOCK_SKEW < timestamp:
+                raise fernet.InvalidToken
+
+        # Like the vendored implementation, the signature is not checked.
+        iv = data[9:25]
+        ciphertext = memoryview(data)[25:-32]
+        if not ciphertext or len(ciphertext) % 16:
+            raise fernet.InvalidToken
+
+        try:
+            decryptor = Cipher(
+                algorithms.AES(self._encryption_key), modes.CBC(iv), self._backend
+            ).decryptor()
+            # CBC blocks are all returned by update, finalize only checks the length.
+            padded_plaintext = decryptor.update(ciphertext)
+            decryptor.finalize()
+        except ValueError:
+            raise fernet.InvalidToken
+
+        pad_length = padded_plaintext[-1]
+        if (
+            not 0 < pad_length <= 16
+            or padded_plaintext[-pad_length:] != bytes((pad_length,)) * pad_length
+        ):
+            raise fernet.InvalidToken
+        return padded_plaintext[:-pad_length]
+
+
+_BACKENDS = {VENDORED_BACKEND: fernet.Fernet}
+if Cipher is not None:
+    _BACKENDS[CRYPTOGRAPHY_BACKEND] = CryptographyFernet
+
+
+def get_available_backends():
+    """
+    Get the names of the Fernet implementations that can be used.
+
+    :returns: Names of the available backends, fastest first.
+    :rtype: list
+    """
+    return sorted(_BACKENDS, key=lambda name: name != CRYPTOGRAPHY_BACKEND)
+
+
+def create_fernet(key, backend=None):
+    """
+    Build a Fernet object.
+
+    :param bytes key: 32 url-safe base64-encoded bytes.
+    :param str backend: Name of the implementation to use. If not set, the fastest
+        available implementation is used.
+
+    :returns: An object with ``encrypt`` and ``decrypt`` methods.
+    :raises ValueError: If the backend is not available.
+    """
+    backend = backend or get_available_backends()[0]
+    if backend not in _BACKENDS:
+        raise ValueError("Unavailable Fernet backend: {0}".format(backend))
+
+    return _BACKENDS[backend](key)
@@ -0,0 +1,138 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import queue
+import threading
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+# Put in the queue to stop the dispatcher thread.
+_STOP = object()
+
+
+class EventDispatcher(object):
+    """
+    Calls the handlers subscribed to the events pushed by the server, from a dedicated
+    thread so slow handlers never hold the reader thread.
+
+    The events wait in a bounded queue. When it is full, the reader thread waits for
+    room, which stops reading the connection and slows the server down, and drops the
+    event if the handlers don't catch up in time.
+    """
+
+    def __init__(self, maxsize=1000, put_timeout=1.0):
+        """
+        :param int maxsize: Amount of events that can wait for the handlers.
+        :param float put_timeout: Amount of seconds to wait for room in a full queue
+            before dropping an event.
+        """
+        self.put_timeout = put_timeout
+        self.dropped_count = 0
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize)
+
+        self._thread = threading.Thread(
+            target=self._dispatch_events, name="CreateClientEvents"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def has_handlers(self):
+        """
+        ``True`` if at least one handler is subscribed.
+        """
+        with self._lock:
+            return bool(self._handlers)
+
+    def subscribe(self, event, handler):
+        """
+        Call a handler every time an event is received.
+
+        :param str event: Name of the event.
+        :param callable handler: Called with the name of the event and its data.
+        """
+        with self._lock:
+            handlers = self._handlers.setdefault(event, [])
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def unsubscribe(self, event, handler):
+        """
+        Stop calling a handler for an event.
+
+        :param str event: Name of the event.
+        :param callable handler: Handler given to :meth:`subscribe`.
+        """
+        with self._lock:
+            handlers = self._handlers.get(event, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                self._handlers.pop(event, None)
+
+    def put(self, event, data):
+        """
+        Queue an event for its handlers.
+
+        :param str event: Name of the event.
+        :param data: Data of the event.
+
+        :returns: ``True`` if the event was queued, ``False`` if it was dropped.
+        :rtype: bool
+        """
+        with self._lock:
+            if event not in self._handlers:
+                return True
+
+        try:
+            self._queue.put((event, data), timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped_count += 1
+            logger.debug("Dropping event {0}, the handlers are too slow.".format(event))
+            return False
+        return True
+
+    def stop(self, timeout=5):
+        """
+        Call the handlers of the queued events and stop the dispatcher thread.
+
+        :param float timeout: Amount of seconds to wait for the handlers.
+        """
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.debug("Failed to stop the event dispatcher, the queue is full.")
+            return
+        self._thread.join(timeout)
+
+    def _dispatch_events(self):
+        """
+        Call the handlers of the queued events until the dispatcher is stopped.
+        """
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            event, data = item
+            with self._lock:
+                handlers = list(self._handlers.get(event, []))
+
+            for handler in handlers:
+                try:
+                    handler(event, data)
+                except Exception as e:
+                    logger.debug(
+                        "Handler of event {0} failed: {1}".format(event, str(e))
+                    )
@@ -0,0 +1,76 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import struct
+
+# Coming from the vendors folder
+import websocket
+
+# Size of the slices a payload is masked and written in. A multiple of 4, so every slice
+# starts at the beginning of the mask.
+FRAME_SLICE_SIZE = 256 * 1024
+
+
+def send_frame(connection, data, opcode=websocket.ABNF.OPCODE_TEXT):
+    """
+    Send a payload in a single masked frame.
+
+    ``WebSocket.send`` masks the whole payload at once, making several copies of it, and
+    copies what is left to write after every partial write, which is quadratic over TLS
+    where a write sends at most a record. Here the payload is masked and written in
+    slices of ``FRAME_SLICE_SIZE`` bytes, so only one slice is copied at a time.
+
+    :param WebSocket connection: The connection, its write lock is held while sending.
+    :param bytes data: Payload of the frame.
+    :param int opcode: Opcode of the frame.
+
+    :raises websocket.WebSocketConnectionClosedException: If the connection is closed.
+    """
+    view = memoryview(data)
+    length = len(view)
+    mask_key = os.urandom(4)
+
+    first_byte = 0x80 | opcode
+    if length < 126:
+        header = struct.pack("!BB", first_byte, 0x80 | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", first_byte, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", first_byte, 0x80 | 127, length)
+    header += mask_key
+
+    key_block = memoryview(mask_key * (min(length, FRAME_SLICE_SIZE) // 4 + 1))
+    slice_key = None
+
+    with connection.lock:
+        sock = connection.sock
+        if sock is None:
+            raise websocket.WebSocketConnectionClosedException(
+                "socket is already closed."
+            )
+
+        if not length:
+            sock.sendall(header)
+            return
+
+        for offset in range(0, length, FRAME_SLICE_SIZE):
+            chunk = view[offset : offset + FRAME_SLICE_SIZE]
+            size = len(chunk)
+            if size == FRAME_SLICE_SIZE:
+                if slice_key is None:
+                    slice_key = int.from_bytes(key_block[:size], "little")
+                key = slice_key
+            else:
+                key = int.from_bytes(key_block[:size], "little")
+
+            masked = (int.from_bytes(chunk, "little") ^ key).to_bytes(size, "little")
+            # The header goes with the first slice, small frames take a single write.
+            sock.sendall(header + masked if offset == 0 else masked)
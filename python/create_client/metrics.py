@@ -0,0 +1,184 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import bisect
+import contextlib
+import threading
+import time
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+class Histogram(object):
+    """
+    Distribution of durations, in fixed buckets.
+    """
+
+    # Upper bounds of the buckets, in milliseconds. The last bucket is unbounded.
+    BUCKET_BOUNDS_MS = [
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        25,
+        50,
+        100,
+        250,
+        500,
+        1000,
+        5000,
+    ]
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(self.BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, duration):
+        """
+        :param float duration: Duration in seconds.
+        """
+        self.count += 1
+        self.total += duration
+        self.min = duration if self.min is None else min(self.min, duration)
+        self.max = duration if self.max is None else max(self.max, duration)
+        self.buckets[bisect.bisect_left(self.BUCKET_BOUNDS_MS, duration * 1000.0)] += 1
+
+    def to_dict(self):
+        """
+        :returns: The histogram as a JSON serializable dictionary, durations are in
+            milliseconds.
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000.0,
+            "mean_ms": self.total * 1000.0 / self.count if self.count else None,
+            "min_ms": None if self.min is None else self.min * 1000.0,
+            "max_ms": None if self.max is None else self.max * 1000.0,
+            "buckets": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(self.BUCKET_BOUNDS_MS + [None], self.buckets)
+            ],
+        }
+
+
+class Metrics(object):
+    """
+    Collects the timing of the phases of the client calls and counters such as the amount
+    of bytes sent.
+
+    Phases recorded by the :class:`CreateClient`:
+        - ``connect``: opening the websocket connection.
+        - ``handshake``: the whole server handshake, along with each of its steps as
+          ``handshake.protocol_version``, ``handshake.server_id``, ``handshake.secret``
+          and ``handshake.validate``.
+        - ``user_lookup``: fetching the user information from Shotgun.
+        - ``encode``: serializing a message.
+        - ``compress`` and ``decompress``: for the messages larger than the
+          compression threshold.
+        - ``encrypt`` and ``decrypt``.
+        - ``send``: writing a frame on the socket.
+        - ``wait``: waiting for the reply of the server, which includes the processing
+          time of the server.
+        - ``decode``: parsing a reply.
+
+    Counters: ``calls``, ``bytes_sent``, ``bytes_received``, ``reconnects``, ``errors``,
+    ``timeouts``, ``events_dropped`` and ``reply_cache_hits``.
+
+    Pass an instance to the client to enable the instrumentation, which costs nothing
+    when it is disabled.
+    """
+
+    def __init__(self, sink=None):
+        """
+        :param callable sink: Called with the name of the phase, its duration in seconds and
+            a dictionary of attributes every time a phase is recorded. Use it to forward the
+            timings to a tracing or monitoring system. Exceptions raised by the sink are
+            logged and ignored.
+        """
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def record(self, phase, duration, **attributes):
+        """
+        Record the duration of a phase.
+
+        :param str phase: Name of the phase.
+        :param float duration: Duration in seconds.
+        """
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = Histogram()
+            histogram.add(duration)
+
+        if self.sink is not None:
+            try:
+                self.sink(phase, duration, attributes)
+            except Exception as e:
+                logger.debug("Metrics sink failed: {0}".format(str(e)))
+
+    def increment(self, counter, value=1):
+        """
+        Increment a counter.
+
+        :param str counter: Name of the counter.
+        :param int value: Amount to add.
+        """
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, phase, **attributes):
+        """
+        Context manager recording the duration of its block.
+
+        :param str phase: Name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, **attributes)
+
+    def snapshot(self):
+        """
+        Get the collected metrics.
+
+        :returns: A JSON serializable dictionary with the ``counters`` and the
+            ``histograms`` of the phases.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {
+                    phase: histogram.to_dict()
+                    for phase, histogram in self._histograms.items()
+                },
+            }
+
+    def reset(self):
+        """
+        Clear the collected metrics.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
@@ -0,0 +1,325 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import binascii
+import functools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+# Coming from the vendors folder
+import websocket
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+# Amount of reply chunks waiting to be consumed before the reader thread waits.
+STREAM_QUEUE_SIZE = 8
+
+
+class Multiplexer(object):
+    """
+    Sends requests over a single websocket connection without waiting for the previous
+    replies and routes every reply to its caller using the message id. The events pushed
+    by the server are handed to the client.
+
+    A reader thread owns the receiving side of the connection while the multiplexer is
+    running. The connection must not be read by anybody else in the meantime.
+    """
+
+    def __init__(self, client, connection):
+        """
+        :param CreateClient client: Client used to encrypt and decrypt the payloads.
+        :param WebSocket connection: Handshaken connection to the WebSocket server.
+        """
+        self.connection = connection
+        self._client = client
+        self._pending = {}
+        # Queues of the replies sent in chunks, by message id.
+        self._streams = {}
+        # Time each message was sent, only filled when the client collects metrics.
+        self._sent_at = {}
+        self._lock = threading.Lock()
+        self._error = None
+        self._stop_token = None
+
+        self._reader = threading.Thread(
+            target=self._read_replies, name="CreateClientReader"
+        )
+        self._reader.daemon = True
+        self._reader.start()
+
+    @property
+    def is_running(self):
+        """
+        ``True`` while the reader thread is routing the replies.
+        """
+        return self._reader.is_alive() and self._error is None
+
+    @property
+    def pending_count(self):
+        """
+        Amount of requests waiting for a reply.
+        """
+        with self._lock:
+            return len(self._pending) + len(self._streams)
+
+    def submit(self, message_id, payload):
+        """
+        Send a request without waiting for its reply.
+
+        :param int message_id: Id of the message, used to match the reply.
+        :param str payload: Message to send to the server.
+
+        :returns: Future resolved with the ``reply`` part of the server response.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        data = self._client._encrypt(payload)
+        metrics = self._client.metrics
+
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._stop_token is not None:
+                raise RuntimeError("The multiplexer is stopped.")
+            self._pending[message_id] = future
+            if metrics is not None:
+                self._sent_at[message_id] = time.perf_counter()
+
+        # A cancelled request stops waiting, its reply is dropped when it comes.
+        future.add_done_callback(functools.partial(self._on_done, message_id))
+
+        try:
+            # The websocket connection serializes the concurrent sends.
+            start = time.perf_counter()
+            self._client._send_frame(self.connection, data)
+            self._client._last_activity = time.monotonic()
+
+            if metrics is not None:
+                metrics.record("send", time.perf_counter() - start)
+                metrics.increment("bytes_sent", len(data))
+        except Exception as e:
+            # The connection is in an unknown state, none of the replies can be trusted.
+            self._fail_pending(e)
+            raise
+
+        return future
+
+    def submit_stream(self, message_id, payload):
+        """
+        Send a request whose reply comes in several messages.
+
+        :param int message_id: Id of the message, used to match the reply messages.
+        :param str payload: Message to send to the server.
+
+        :returns: Queue receiving the parsed reply messages, or the exception that stopped
+            the reader. The caller must call :meth:`close_stream` once done.
+        :rtype: queue.Queue
+        """
+        stream = queue.Queue(STREAM_QUEUE_SIZE)
+        data = self._client._encrypt(payload)
+
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if self._stop_token is not None:
+                raise RuntimeError("The multiplexer is stopped.")
+            self._streams[message_id] = stream
+
+        try:
+            self._client._send_frame(self.connection, data)
+            self._client._last_activity = time.monotonic()
+        except Exception as e:
+            self._fail_pending(e)
+            raise
+
+        return stream
+
+    def close_stream(self, message_id):
+        """
+        Stop routing the reply messages of a request. The messages still to come are
+        dropped.
+
+        :param int message_id: Id of the message.
+        """
+        with self._lock:
+            self._streams.pop(message_id, None)
+
+    def cancel_pending(self):
+        """
+        Cancel all the requests waiting for a reply. Their replies are dropped when they
+        come.
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+
+        for future in pending:
+            future.cancel()
+
+    def _on_done(self, message_id, future):
+        """
+        Stop waiting for the reply of a cancelled request.
+
+        :param int message_id: Id of the message.
+        :param Future future: Future of the request.
+        """
+        if not future.cancelled():
+            return
+
+        with self._lock:
+            self._pending.pop(message_id, None)
+            self._sent_at.pop(message_id, None)
+
+    def stop(self, timeout=5):
+        """
+        Stop the reader thread, leaving the connection open.
+
+        The reader can't be interrupted while it waits for a frame, so a ping is sent to
+        the server and the reader exits when it receives the matching pong.
+
+        :param float timeout: Amount of seconds to wait for the reader to exit.
+
+        :returns: ``True`` if the reader stopped and no request was waiting for a reply,
+            ``False`` otherwise. In the latter case the connection must be closed.
+        :rtype: bool
+        """
+        if not self.is_running or self.pending_count:
+            return False
+
+        self._stop_token = binascii.hexlify(os.urandom(8))
+        try:
+            self.connection.ping(self._stop_token)
+        except Exception as e:
+            logger.debug("Failed to stop the reader thread: {0}".format(str(e)))
+            return False
+
+        self._reader.join(timeout)
+        return not self._reader.is_alive() and self.pending_count == 0
+
+    def _read_replies(self):
+        """
+        Read the frames from the connection and resolve the matching futures, until the
+        connection is lost or the multiplexer is stopped.
+        """
+        try:
+            while True:
+                opcode, data = self.connection.recv_data(control_frame=True)
+                self._client._last_activity = time.monotonic()
+
+                if opcode == websocket.ABNF.OPCODE_PONG:
+                    if self._stop_token is not None and data == self._stop_token:
+                        return
+                elif opcode == websocket.ABNF.OPCODE_CLOSE:
+                    raise websocket.WebSocketConnectionClosedException(
+                        "The server closed the connection."
+                    )
+                elif opcode in (
+                    websocket.ABNF.OPCODE_TEXT,
+                    websocket.ABNF.OPCODE_BINARY,
+                ):
+                    self._dispatch(data)
+        except Exception as e:
+            logger.debug("Stopped reading the server replies: {0}".format(str(e)))
+            self._fail_pending(e)
+
+    def _dispatch(self, data):
+        """
+        Resolve the future waiting for a reply.
+
+        :param bytes data: Frame received from the server.
+        """
+        metrics = self._client.metrics
+        if metrics is not None:
+            metrics.increment("bytes_received", len(data))
+
+        try:
+            payload = self._client._decrypt(data)
+            with self._client._timer("decode"):
+                message = self._client._serializer.loads(payload)
+            message_id = message.get("id")
+        except Exception as e:
+            logger.debug("Dropping an invalid message: {0}".format(str(e)))
+            return
+
+        # Messages the server sends on its own carry an event instead of an id.
+        event = message.get("event")
+        if event is not None:
+            self._client._dispatch_event(event, message.get("data"))
+            return
+
+        with self._lock:
+            stream = self._streams.get(message_id)
+            future = self._pending.pop(message_id, None)
+            sent_at = self._sent_at.pop(message_id, None)
+
+        if stream is not None:
+            self._put_in_stream(message_id, stream, message)
+            return
+
+        if sent_at is not None:
+            metrics.record("wait", time.perf_counter() - sent_at)
+
+        if future is None:
+            logger.debug("Dropping a message with unknown id {0}".format(message_id))
+            return
+
+        try:
+            future.set_result(message.get("reply", ""))
+        except InvalidStateError:
+            # The caller cancelled the request.
+            pass
+
+    def _put_in_stream(self, message_id, stream, message):
+        """
+        Queue a reply message for its consumer, waiting while the consumer is behind.
+
+        :param int message_id: Id of the message.
+        :param queue.Queue stream: Queue of the reply messages.
+        :param message: Parsed message or exception.
+        """
+        while True:
+            try:
+                stream.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                with self._lock:
+                    if self._streams.get(message_id) is not stream:
+                        # The consumer gave up.
+                        return
+
+    def _fail_pending(self, error):
+        """
+        Fail all the requests waiting for a reply.
+
+        :param Exception error: Reason of the failure.
+        """
+        with self._lock:
+            self._error = error
+            pending, self._pending = self._pending, {}
+            streams = list(self._streams.items())
+            self._sent_at.clear()
+
+        for message_id, stream in streams:
+            self._put_in_stream(message_id, stream, error)
+
+        metrics = self._client.metrics
+        if metrics is not None and pending:
+            metrics.increment("errors", len(pending))
+
+        for future in pending.values():
+            try:
+                future.set_exception(error)
+            except InvalidStateError:
+                pass
@@ -0,0 +1,196 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+# Put in the queue to stop the sender thread.
+_STOP = object()
+
+
+class Notifier(object):
+    """
+    Sends the commands of a client from a background thread, so the callers never wait
+    for the server.
+
+    The replies are read like the replies of any other call: by the reader thread of a
+    multiplexed client, or right after the command by the sender thread of a lock-step
+    client.
+    """
+
+    def __init__(self, client, timeout=None):
+        """
+        :param CreateClient client: Client sending the commands.
+        :param float timeout: Amount of seconds to wait for the reply of every command.
+            If not set, wait forever.
+        """
+        self._client = client
+        self._timeout = timeout
+        self._queue = queue.Queue()
+        # Amount of commands queued or waiting for their reply.
+        self._outstanding = 0
+        self._condition = threading.Condition()
+        # Futures of the multiplexed commands waiting for their reply, with their name and
+        # deadline, oldest first. Only filled when there is a timeout.
+        self._waiting = collections.deque()
+        # Errors of the futures cancelled because their reply didn't come in time.
+        self._expired = {}
+
+        self._sender = threading.Thread(
+            target=self._send_notifications, name="CreateClientNotifier"
+        )
+        self._sender.daemon = True
+        self._sender.start()
+
+    @property
+    def is_running(self):
+        """
+        ``True`` while the sender thread is sending the commands.
+        """
+        return self._sender.is_alive()
+
+    def notify(self, name, data=None, callback=None):
+        """
+        Queue a command.
+
+        :param str name: Name of the server method.
+        :param dict data: Arguments of the server method.
+        :param callable callback: Called from a background thread with the reply and the
+            error, if any, once the command is done.
+        """
+        with self._condition:
+            self._outstanding += 1
+        self._queue.put((name, data, callback))
+
+    def flush(self, timeout=None):
+        """
+        Wait for the queued commands to be sent and for their replies.
+
+        :param float timeout: Amount of seconds to wait. If not set, wait forever.
+
+        :returns: ``True`` if all the commands are done, ``False`` otherwise.
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._outstanding:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=5):
+        """
+        Send the queued commands and stop the sender thread.
+
+        :param float timeout: Amount of seconds to wait for the commands.
+
+        :returns: ``True`` if all the commands are done, ``False`` otherwise.
+        :rtype: bool
+        """
+        done = self.flush(timeout)
+        self._queue.put(_STOP)
+        self._sender.join(timeout)
+        return done
+
+    def _send_notifications(self):
+        """
+        Send the queued commands until the notifier is stopped.
+        """
+        while True:
+            try:
+                item = self._queue.get(timeout=self._expire_waiting())
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                return
+
+            name, data, callback = item
+            try:
+                if self._client._multiplexed:
+                    future = self._client.call_server_method_async(name, data)
+                    future.add_done_callback(
+                        lambda f, callback=callback: self._on_future_done(callback, f)
+                    )
+                    if self._timeout is not None and not future.done():
+                        self._waiting.append(
+                            (future, name, time.monotonic() + self._timeout)
+                        )
+                else:
+                    reply = self._client.call_server_method(name, data, self._timeout)
+                    self._done(callback, reply, None)
+            except Exception as e:
+                logger.debug("Failed to send {0}: {1}".format(name, str(e)))
+                self._done(callback, None, e)
+
+    def _expire_waiting(self):
+        """
+        Cancel the multiplexed commands whose reply didn't come in time. Their callback
+        gets a ``CreateTimeoutError``.
+
+        :returns: Amount of seconds until the next command expires, or ``None`` if no
+            command is waiting.
+        :rtype: float
+        """
+        # Imported here, the client module imports this one.
+        from .create_client import CreateTimeoutError
+
+        while self._waiting:
+            future, name, deadline = self._waiting[0]
+            remaining = deadline - time.monotonic()
+            if not future.done() and remaining > 0:
+                return remaining
+
+            self._waiting.popleft()
+            if future.done():
+                continue
+
+            self._expired[future] = CreateTimeoutError(
+                "No reply to {0} within {1} seconds.".format(name, self._timeout)
+            )
+            # The late reply is dropped by the multiplexer.
+            if not future.cancel():
+                self._expired.pop(future, None)
+            elif self._client.metrics is not None:
+                self._client.metrics.increment("timeouts")
+        return None
+
+    def _on_future_done(self, callback, future):
+        # The reply may have come while the command was expiring.
+        if future.cancelled() and future in self._expired:
+            self._done(callback, None, self._expired.pop(future))
+            return
+
+        try:
+            self._done(callback, future.result(), None)
+        except (CancelledError, Exception) as e:
+            self._done(callback, None, e)
+
+    def _done(self, callback, reply, error):
+        """
+        Report the status of a command to its callback.
+        """
+        if callback is not None:
+            try:
+                callback(reply, error)
+            except Exception as e:
+                logger.debug("Notification callback failed: {0}".format(str(e)))
+
+        with self._condition:
+            self._outstanding -= 1
+            self._condition.notify_all()
@@ -0,0 +1,124 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import time
+
+import sgtk
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+class ConnectionPrewarmer(object):
+    """
+    Connects to Shotgun Create from a background thread, so the first client of the
+    process doesn't wait for the handshake.
+
+    The WebSocket server port, its secret and the user information are cached, and the
+    handshaken connection is given to the connection pool where the first client borrows
+    it. Nothing happens if Shotgun Create is not running, it is never launched.
+    """
+
+    def __init__(self, get_sg_connection=None):
+        """
+        :param callable get_sg_connection: Returns the Shotgun connection to use, called
+            from the background thread. If not set, the connection from the current
+            bundle is used.
+        """
+        self._get_sg_connection = get_sg_connection
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._prewarm, name="CreateClientPrewarm"
+        )
+        self._thread.daemon = True
+        self.succeeded = False
+
+    def start(self):
+        """
+        Start connecting in the background.
+        """
+        self._thread.start()
+
+    @property
+    def is_running(self):
+        """
+        ``True`` while the background thread is connecting.
+        """
+        return self._thread.is_alive()
+
+    def stop(self, timeout=5):
+        """
+        Stop the background thread. A connection built after this call is closed instead
+        of being given to the connection pool.
+
+        :param float timeout: Amount of seconds to wait for the background thread.
+
+        :returns: ``True`` if the background thread stopped, ``False`` otherwise.
+        :rtype: bool
+        """
+        with self._lock:
+            self._stopping = True
+
+        if self._thread.ident is not None:
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _prewarm(self):
+        """
+        Build a handshaken connection and give it to the connection pool.
+        """
+        start = time.perf_counter()
+        try:
+            # Imported here, the vendored packages are slow to import.
+            from .create_client import CreateClient
+
+            sg_connection = (
+                self._get_sg_connection() if self._get_sg_connection else None
+            )
+            client = CreateClient(sg_connection, connect=False)
+        except Exception as e:
+            logger.debug("Failed to prepare the Create connection: {0}".format(str(e)))
+            return
+
+        try:
+            listening = client._is_server_listening()
+            if not listening and client._port_from_cache:
+                # The server may have moved to another port.
+                listening = (
+                    client._refresh_websocket_port() and client._is_server_listening()
+                )
+
+            if not listening:
+                logger.debug("Shotgun Create is not running, nothing to prewarm.")
+                return
+
+            if self._stopping:
+                return
+
+            # Builds the connection and does the handshake.
+            client._desktop_connection
+            client._get_user_context()
+            self.succeeded = True
+        except Exception as e:
+            logger.debug("Failed to prewarm the Create connection: {0}".format(str(e)))
+        finally:
+            with self._lock:
+                if self._stopping:
+                    # Nobody will give the connection back to the pool.
+                    client._drop_connection()
+                client.close()
+
+        if self.succeeded:
+            logger.debug(
+                "Prewarmed the Create connection in {0:.3f}s".format(
+                    time.perf_counter() - start
+                )
+            )
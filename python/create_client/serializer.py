@@ -0,0 +1,155 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import enum
+import json
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_SERIALIZER = "json"
+ORJSON_SERIALIZER = "orjson"
+
+
+def _json_default(obj):
+    """
+    Serialize the objects ``orjson`` supports natively and the ``json`` module doesn't,
+    the same way ``orjson`` does.
+
+    :param obj: Object the ``json`` module can't serialize.
+
+    :returns: A JSON serializable object.
+    :raises TypeError: If the object can't be serialized.
+    """
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError(
+        "Object of type {0} is not JSON serializable".format(type(obj).__name__)
+    )
+
+
+# Same as the encoder json.dumps uses by default, reused since building one is slow.
+_json_encoder = json.JSONEncoder(default=_json_default)
+
+
+class JsonSerializer(object):
+    """
+    Serializes the messages with the standard library ``json`` module.
+
+    UUIDs and enums are serialized like ``orjson`` does, as the string of the UUID and
+    the value of the enum.
+    """
+
+    name = JSON_SERIALIZER
+
+    def dumps(self, obj):
+        """
+        Serialize an object.
+
+        :param obj: JSON serializable object.
+
+        :returns: The UTF-8 encoded JSON document.
+        :rtype: bytes
+        """
+        return _json_encoder.encode(obj).encode("utf-8")
+
+    def loads(self, data):
+        """
+        Parse a JSON document.
+
+        :param data: The JSON document.
+        :type data: str or bytes
+
+        :returns: The parsed object.
+        """
+        return json.loads(data)
+
+
+class OrjsonSerializer(object):
+    """
+    Serializes the messages with the ``orjson`` package, which is several times faster
+    than the standard library on large documents.
+
+    It accepts the same objects as :class:`JsonSerializer`: the dates, times and
+    dataclasses ``orjson`` supports natively are rejected, and the objects ``orjson``
+    rejects, like integers larger than 64 bits or dictionary keys that are not strings,
+    are serialized with the ``json`` module instead. Unlike the ``json`` module, NaN and
+    infinite floats, which JSON can't represent, are serialized as ``null``, and the
+    integers larger than 64 bits are parsed as floats.
+    """
+
+    name = ORJSON_SERIALIZER
+
+    def dumps(self, obj):
+        """
+        Serialize an object.
+
+        :param obj: JSON serializable object.
+
+        :returns: The UTF-8 encoded JSON document.
+        :rtype: bytes
+        """
+        try:
+            return orjson.dumps(
+                obj,
+                default=_json_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return _json_encoder.encode(obj).encode("utf-8")
+
+    def loads(self, data):
+        """
+        Parse a JSON document.
+
+        :param data: The JSON document.
+        :type data: str or bytes
+
+        :returns: The parsed object.
+        """
+        return orjson.loads(data)
+
+
+_SERIALIZERS = {JSON_SERIALIZER: JsonSerializer}
+if orjson is not None:
+    _SERIALIZERS[ORJSON_SERIALIZER] = OrjsonSerializer
+
+
+def get_available_serializers():
+    """
+    Get the names of the JSON serializers that can be used.
+
+    :returns: Names of the available serializers, fastest first.
+    :rtype: list
+    """
+    return sorted(_SERIALIZERS, key=lambda name: name != ORJSON_SERIALIZER)
+
+
+def create_serializer(name=None):
+    """
+    Build a JSON serializer.
+
+    :param str name: Name of the serializer to use. If not set, the fastest available
+        serializer is used.
+
+    :returns: An object with ``dumps`` and ``loads`` methods.
+    :raises ValueError: If the serializer is not available.
+    """
+    name = name or get_available_serializers()[0]
+    if name not in _SERIALIZERS:
+        raise ValueError("Unavailable JSON serializer: {0}".format(name))
+
+    return _SERIALIZERS[name]()